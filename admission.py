@@ -0,0 +1,147 @@
+"""Admission control for render-heavy endpoints.
+
+Two layers, both in-process:
+- per-client token buckets (RATE_LIMIT_PER_MIN, RATE_LIMIT_BURST), tracked in
+  an LRU capped at RATE_LIMIT_MAX_CLIENTS so memory stays bounded -> 429
+- a global cap on concurrent renders (RENDER_CONCURRENCY, default CPU count);
+  an on-demand PNG request waits up to RENDER_QUEUE_TIMEOUT seconds for a
+  slot -> 503. Background renders queue for a slot instead; the request that
+  started them only pays the token bucket, unless RENDER_QUEUE_MAX of them are
+  already queued or running -> 503.
+
+Shed requests get a Retry-After header. Counters are exposed on /metrics.
+"""
+from __future__ import annotations
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from codec import JSONResponse
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens, self.updated = burst, now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Take one token. Returns 0 if admitted, else seconds until one is available."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+class Admission:
+    def __init__(self, per_minute: float, burst: float, max_clients: int, concurrency: int, queue_timeout: float,
+                 render_queue_max: int = 0):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self.queue_timeout = queue_timeout
+        self.concurrency = concurrency
+        self.render_queue_max = render_queue_max
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._slots = asyncio.Semaphore(concurrency)
+        self.counters: Dict[str, int] = {
+            "admitted": 0,
+            "shed_rate_limited": 0,
+            "shed_overloaded": 0,
+            "clients_evicted": 0,
+        }
+
+    def client_retry_after(self, client: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.burst, now)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self.counters["clients_evicted"] += 1
+        else:
+            self._clients.move_to_end(client)
+        wait = bucket.take(self.rate, self.burst, now)
+        if wait:
+            self.counters["shed_rate_limited"] += 1
+        return wait
+
+    async def acquire_render(self) -> bool:
+        try:
+            if self.queue_timeout > 0:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            elif self._slots.locked():
+                raise asyncio.TimeoutError
+            else:
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            self.counters["shed_overloaded"] += 1
+            return False
+        self.counters["admitted"] += 1
+        return True
+
+    async def wait_render(self):
+        """Take a render slot for background work, however long the queue is."""
+        await self._slots.acquire()
+        self.counters["admitted"] += 1
+
+    def render_queue_full(self, queued: int) -> bool:
+        """True (and counted as shed) if `queued` background renders is the limit."""
+        if self.render_queue_max <= 0 or queued < self.render_queue_max:
+            return False
+        self.counters["shed_overloaded"] += 1
+        return True
+
+    def release_render(self):
+        self._slots.release()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+def rate_limited(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"ok": False, "error": "Too many requests. Please try again shortly."},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def overloaded() -> JSONResponse:
+    return JSONResponse(
+        {"ok": False, "error": "Busy right now. Please try again in a moment."},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+def trusted_hops() -> int:
+    """TRUST_PROXY: how many proxies in front of the app append to X-Forwarded-For."""
+    v = os.getenv("TRUST_PROXY", "0")
+    if v in ("true", "True"):
+        return 1
+    return int(v) if v not in ("false", "False", "") else 0
+
+def client_key(request, hops: Optional[int] = None) -> str:
+    # Each proxy appends the address it saw, so only the last `hops` entries
+    # are trustworthy; anything left of them is whatever the client sent.
+    if hops is None:
+        hops = trusted_hops()
+    if hops > 0:
+        fwd = [a.strip() for a in request.headers.get("x-forwarded-for", "").split(",")]
+        if len(fwd) >= hops and fwd[-hops]:
+            return fwd[-hops]
+    return request.client.host if request.client else "unknown"
+
+def from_env() -> Admission:
+    return Admission(
+        per_minute=float(os.getenv("RATE_LIMIT_PER_MIN", "20")),
+        burst=float(os.getenv("RATE_LIMIT_BURST", "10")),
+        max_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000")),
+        concurrency=int(os.getenv("RENDER_CONCURRENCY", "0")) or (os.cpu_count() or 2),
+        queue_timeout=float(os.getenv("RENDER_QUEUE_TIMEOUT", "2")),
+        render_queue_max=int(os.getenv("RENDER_QUEUE_MAX", "100")),
+    )
@@ -1,16 +1,39 @@
 from __future__ import annotations
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-import json
+from typing import Dict
 import datetime as dt, uuid, datetime as dt
-
-from receipt_engine import build_receipt
-from renderer import render_receipt_png, render_badge_png
-
-import os, smtplib
-from email.message import EmailMessage
+import asyncio
+import logging
+import threading
+
+from codec import JSONResponse
+from models import (
+    SurveyIn, SubscribeIn, OptinIn, ReceiptLiteOut, OkOut, OptinOut,
+    SURVEY_MAX_BYTES, SUBSCRIBE_MAX_BYTES, OPTIN_MAX_BYTES, parse_body,
+)
+from receipt_engine import build_receipt, rules
+import admission
+import codec
+import export
+import idempotency
+import layout
+import progress
+import retention
+import sharepage
+import storage
+import tracing
+
+import os
+
+# Keep this import path minimal: Pillow (via `renderer`) and smtplib are only
+# imported by the warm-up thread or the first request that needs them, so the
+# worker can bind its socket before any heavy work happens.
+
+log = logging.getLogger("chambiar")
 
 def _send_optin_email(to_addr: str, subject: str, body: str) -> tuple[bool, str]:
     host = os.getenv("SMTP_HOST", "").strip()
@@ -23,6 +46,9 @@ def _send_optin_email(to_addr: str, subject: str, body: str) -> tuple[bool, str]
     if not host or not from_addr:
         return (False, "not_configured")
 
+    import smtplib
+    from email.message import EmailMessage
+
     msg = EmailMessage()
     msg["From"] = from_addr
     msg["To"] = to_addr
@@ -30,7 +56,7 @@ def _send_optin_email(to_addr: str, subject: str, body: str) -> tuple[bool, str]
     msg.set_content(body)
 
     try:
-        with smtplib.SMTP(host, port, timeout=20) as s:
+        with tracing.span("smtp.send", **{"smtp.host": host}), smtplib.SMTP(host, port, timeout=20) as s:
             s.ehlo()
             if use_tls:
                 s.starttls()
@@ -44,42 +70,147 @@ def _send_optin_email(to_addr: str, subject: str, body: str) -> tuple[bool, str]
 
 
 BASE = Path(__file__).resolve().parent
-DATA = BASE / "data"
-RECEIPTS = DATA / "receipts"
-IMAGES = DATA / "images"
-BADGES = DATA / "badges"
+DATA = layout.data_dir()
 WAITLIST = DATA / "waitlist.jsonl"
 SUBSCRIBERS = DATA / "subscribers.jsonl"
-RECEIPTS.mkdir(parents=True, exist_ok=True)
-IMAGES.mkdir(parents=True, exist_ok=True)
-BADGES.mkdir(parents=True, exist_ok=True)
+INDEX_HTML = BASE / "static" / "index.html"
+# no proxy buffering or caching for /api/events streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Startup phases: (1) import + bind, (2) create the data dir, (3) warm-up thread
+# opens the blob store, maps the shared render cache (sharedcache.py) and loads
+# fonts and page templates. /readyz stays 503 until phase 3 finishes so the
+# load balancer never routes to a cold worker.
+_READY = threading.Event()
+_TEMPLATES: dict = {}
+
+# Receipts, images and badges live in a BlobStore (local disk or S3, see
+# storage.py) so any node can serve any receipt.
+_store = storage.get_store
+
+def _ensure_dirs():
+    DATA.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="Chambiar Receipt MVP")
+def _warm_up():
+    try:
+        _store()
+        import renderer
+        import sharedcache
+        sharedcache.attach()
+        renderer.warm_up()
+        _TEMPLATES["index"] = INDEX_HTML.read_text(encoding="utf-8")
+        if EXPORTER is not None:
+            EXPORTER.export_static()
+    except Exception:
+        log.exception("warm-up failed; worker will stay unready")
+        return
+    _READY.set()
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    _ensure_dirs()
+    tracing.start()
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    sweeper = retention.start_sweeper(DATA, _store())
+    yield
+    if sweeper is not None:
+        sweeper.stop()
+    # let background renders finish so no receipt is left without images
+    pending = [job.task for job in _RENDERS.values() if job.task is not None]
+    if pending:
+        await asyncio.wait(pending, timeout=30)
+    tracing.stop()
+
+app = FastAPI(title="Chambiar Receipt MVP", lifespan=_lifespan)
+# TRACE_SAMPLE_RATE: per-request spans to a JSONL file (see tracing.py)
+app.add_middleware(tracing.TraceMiddleware)
+ADMISSION = admission.from_env()
+# EXPORT_DIR: mirror share pages into a static tree (see export.py)
+EXPORTER = export.from_env()
+IDEMPOTENCY = idempotency.from_env()
 app.mount("/static", StaticFiles(directory=str(BASE / "static")), name="static")
 
-def _save_receipt(receipt: dict) -> str:
+# Browsers get SVG (a few KB, cheap to produce). PNGs are rasterized only
+# where a bitmap is required: the badge up front for LinkedIn (og:image,
+# download), the receipt lazily on its first /i/{rid}.png request.
+def _render_blob(kind: str, ext: str, receipt: dict) -> bytes:
+    import renderer
+
+    return renderer.render_blob(kind, ext, receipt)
+
+# Images are rendered after /api/receipt-lite has answered; progress is
+# streamed from /api/events/{rid} (see progress.py). Jobs live here until done.
+_RENDERS: Dict[str, progress.RenderJob] = {}
+
+async def _render_in_background(receipt: dict, job: progress.RenderJob):
+    """Render and store the receipt's images, badge first, in one admission slot."""
+    store = _store()
+    try:
+        await ADMISSION.wait_render()
+        try:
+            for name, keys in progress.MILESTONES.items():
+                blobs = {}
+                for key in keys:
+                    key = key.format(rid=job.rid)
+                    kind, _, ext = storage.split_key(key)
+                    blobs[key] = await asyncio.to_thread(_render_blob, kind, ext[1:], receipt)
+                await asyncio.gather(*(store.put(k, v) for k, v in blobs.items()))
+                job.emit(name)
+            if EXPORTER is not None:
+                await asyncio.to_thread(EXPORTER.export_receipt, store, job.rid)
+        finally:
+            ADMISSION.release_render()
+    except Exception:
+        log.exception("background render failed for %s", job.rid)
+    finally:
+        job.finish()
+        _RENDERS.pop(job.rid, None)
+
+async def _save_receipt(receipt: dict) -> str:
+    """Store the receipt and start rendering its images in the background."""
     rid = str(uuid.uuid4())[:8]
     receipt["receipt_id"] = rid
-    (RECEIPTS / f"{rid}.json").write_text(json.dumps(receipt, indent=2), encoding="utf-8")
-    render_receipt_png(receipt, str(IMAGES / f"{rid}.png"))
-    render_badge_png(receipt, str(BADGES / f"{rid}.png"))
+    # the JSON goes first: image routes render on demand for any stored receipt
+    await _store().put(f"receipts/{rid}.json", codec.dumps(receipt))
+    job = _RENDERS[rid] = progress.RenderJob(rid)
+    job.task = asyncio.create_task(_render_in_background(receipt, job))
     return rid
 
+@app.get("/readyz")
+def readyz():
+    if not _READY.is_set():
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
+
+@app.get("/metrics")
+def metrics():
+    lines = [f"chambiar_admission_{k}_total {v}" for k, v in ADMISSION.counters.items()]
+    lines.append(f"chambiar_admission_tracked_clients {ADMISSION.clients}")
+    lines += [f"chambiar_idempotency_{k}_total {v}" for k, v in IDEMPOTENCY.counters.items()]
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 @app.get("/", response_class=HTMLResponse)
 def home():
-    return FileResponse(str(BASE / "static" / "index.html"))
-
-@app.post("/api/receipt-lite")
-async def receipt_lite(request: Request):
-    payload = await request.json()
-    receipt = build_receipt(payload or {})
-    rid = _save_receipt(receipt)
-    top2 = sorted(receipt["signals"]["scores"].items(), key=lambda kv: kv[1], reverse=True)[:2]
+    if "index" in _TEMPLATES:
+        return HTMLResponse(_TEMPLATES["index"])
+    return FileResponse(str(INDEX_HTML))
+
+async def _create_receipt(survey: SurveyIn):
+    """Score and store one submission and queue its renders: the response payload."""
+    if ADMISSION.render_queue_full(len(_RENDERS)):
+        return admission.overloaded()
+    with tracing.span("build_receipt"):
+        receipt = build_receipt(survey.model_dump(exclude={"client_token"}))
+    rid = await _save_receipt(receipt)
+    top2 = sharepage.top_areas(receipt)
     return {
         "receipt_id": rid,
         "receipt_url": f"/r/{rid}",
         "image_url": f"/i/{rid}.png",
         "badge_url": f"/b/{rid}.png",
+        "image_svg_url": f"/i/{rid}.svg",
+        "badge_svg_url": f"/b/{rid}.svg",
+        "events_url": f"/api/events/{rid}",
 
         # keys for UI
         "house_key": receipt["house_key"],
@@ -100,46 +231,105 @@ async def receipt_lite(request: Request):
         "top_areas": top2,
     }
 
+@app.post("/api/receipt-lite", response_model=ReceiptLiteOut)
+async def receipt_lite(request: Request):
+    survey = await parse_body(request, SurveyIn, SURVEY_MAX_BYTES)
+    if isinstance(survey, JSONResponse):
+        return survey
+    # double-clicks, retries and reloads get the first response back, and a
+    # replay costs the client no rate-limit token
+    ident = idempotency.request_key(request, survey) if IDEMPOTENCY.ttl > 0 else None
+    if ident is not None and IDEMPOTENCY.conflicts(*ident):
+        return idempotency.key_reused()
+    if ident is None or not IDEMPOTENCY.seen(ident[0]):
+        retry_after = ADMISSION.client_retry_after(admission.client_key(request))
+        if retry_after:
+            return admission.rate_limited(retry_after)
+    if ident is None:
+        out, replayed = await _create_receipt(survey), False
+    else:
+        key, payload = ident
+        out, replayed = await IDEMPOTENCY.run(
+            key, lambda: _create_receipt(survey), ok=lambda r: not isinstance(r, JSONResponse), payload=payload)
+    if isinstance(out, JSONResponse):
+        return out
+    return JSONResponse(out, headers={"Idempotent-Replayed": "true"} if replayed else None)
+
+# Scoring rules for static/scoring.js. The unversioned URL is short-lived and
+# revalidated by ETag; versioned URLs never change.
+@app.get("/api/rules.json")
+def rules_current(request: Request):
+    r = rules()
+    etag = f'"{r["version"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(r, headers={"Cache-Control": "public, max-age=300", "ETag": etag})
+
+@app.get("/api/rules/{version}.json")
+def rules_versioned(version: str):
+    r = rules()
+    if version != r["version"]:
+        return JSONResponse({"error":"Not found"}, status_code=404)
+    return JSONResponse(r, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
-async def _append_subscriber(payload: dict):
-    email = (payload.get("email") or "").strip()
+@app.get("/api/events/{rid}")
+async def receipt_events(rid: str):
+    if not layout.valid_id(rid):
+        return JSONResponse({"error":"Not found"}, status_code=404)
+    job = _RENDERS.get(rid)
+    if job is not None:
+        body = job.stream()
+    elif await _store().exists(f"receipts/{rid}.json"):
+        # rendered by another worker, or already done
+        body = progress.poll_store(_store(), rid)
+    else:
+        return JSONResponse({"error":"Not found"}, status_code=404)
+    return StreamingResponse(body, media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def _append_subscriber(payload: SubscribeIn):
+    email = payload.email
     if not email or "@" not in email:
         return JSONResponse({"ok": False, "error": "Valid email required."}, status_code=400)
 
     prefs = {
-        "beta_tester": bool(payload.get("beta_tester")),
-        "newsletter": bool(payload.get("newsletter")),
-        "notify_launch": bool(payload.get("notify_launch")),
+        "beta_tester": payload.beta_tester,
+        "newsletter": payload.newsletter,
+        "notify_launch": payload.notify_launch,
     }
 
     record = {
         "email": email,
         "created_at": dt.datetime.utcnow().isoformat() + "Z",
-        "receipt_id": payload.get("receipt_id"),
-        "house": payload.get("house"),
-        "variant": payload.get("variant"),
-        "top_areas": payload.get("top_areas"),
-        "utm": payload.get("utm", {}),
+        "receipt_id": payload.receipt_id,
+        "house": payload.house,
+        "variant": payload.variant,
+        "top_areas": payload.top_areas,
+        "utm": payload.utm,
         "prefs": prefs,
-        "source": payload.get("source", "unknown"),
+        "source": payload.source,
     }
 
     DATA.mkdir(parents=True, exist_ok=True)
-    with SUBSCRIBERS.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record) + "\n")
+    with tracing.span("subscribers.append"), SUBSCRIBERS.open("ab") as f:
+        f.write(codec.dumps(record) + b"\n")
+    rid = str(record["receipt_id"] or "")
+    if layout.valid_id(rid):
+        # shared marker so retention on any node keeps this receipt
+        await _store().put(f"keep/{rid}", b"")
 
     return JSONResponse({"ok": True})
 
 
-@app.post("/api/optin")
+@app.post("/api/optin", response_model=OptinOut)
 async def optin(request: Request):
-    payload = await request.json()
-    payload = payload or {}
-    email = (payload.get("email") or "").strip()
+    payload = await parse_body(request, OptinIn, OPTIN_MAX_BYTES)
+    if isinstance(payload, JSONResponse):
+        return payload
+    email = payload.email
     prefs = {
-        "notify_launch": bool(payload.get("notify_launch")),
-        "beta_tester": bool(payload.get("beta_tester")),
-        "newsletter": bool(payload.get("newsletter")),
+        "notify_launch": payload.notify_launch,
+        "beta_tester": payload.beta_tester,
+        "newsletter": payload.newsletter,
     }
 
     # If no email, do nothing (success)
@@ -157,162 +347,85 @@ async def optin(request: Request):
         f"Submitted at (UTC): {dt.datetime.utcnow().isoformat()}Z\n"
     )
 
-    sent, err = _send_optin_email(to_addr, subject, body)
+    sent, err = await asyncio.to_thread(_send_optin_email, to_addr, subject, body)
     # Never block user flow
     return JSONResponse({"ok": True, "sent": sent, "error": err if not sent else ""})
 
 
-@app.post("/api/subscribe")
+@app.post("/api/subscribe", response_model=OkOut)
 async def subscribe(request: Request):
-    payload = await request.json()
-    payload = payload or {}
+    payload = await parse_body(request, SubscribeIn, SUBSCRIBE_MAX_BYTES)
+    if isinstance(payload, JSONResponse):
+        return payload
     return await _append_subscriber(payload)
 
-@app.post("/api/waitlist")
+@app.post("/api/waitlist", response_model=OkOut)
 async def waitlist(request: Request):
     # Backwards-compatible alias: treat as "notify_launch"
-    payload = await request.json()
-    payload = payload or {}
-    payload.setdefault("notify_launch", True)
-    payload.setdefault("source", "waitlist_alias")
+    payload = await parse_body(request, SubscribeIn, SUBSCRIBE_MAX_BYTES)
+    if isinstance(payload, JSONResponse):
+        return payload
+    if "notify_launch" not in payload.model_fields_set:
+        payload.notify_launch = True
+    if "source" not in payload.model_fields_set:
+        payload.source = "waitlist_alias"
     return await _append_subscriber(payload)
 
 @app.get("/r/{rid}", response_class=HTMLResponse)
-def receipt_page(rid: str):
-    p = RECEIPTS / f"{rid}.json"
-    if not p.exists():
+async def receipt_page(rid: str, request: Request):
+    raw = await _store().get(f"receipts/{rid}.json") if layout.valid_id(rid) else None
+    if raw is None:
         return HTMLResponse("Not found", status_code=404)
-    receipt = json.loads(p.read_text(encoding="utf-8"))
-    top2 = sorted(receipt["signals"]["scores"].items(), key=lambda kv: kv[1], reverse=True)[:2]
-
-    cards_html = "".join([
-        f"<div class='mini'><h4>{c['title']}</h4>"
-        f"<div><b>Signal:</b> {c['signal']}</div>"
-        f"<div><b>Maria does:</b> {c['maria']}</div>"
-        f"<div><b>Outcome:</b> {c['outcome']}</div></div>"
-        for c in receipt.get("cheat_sheet", [])
-    ])
-
-    caption_plain = (
-        f"I’m {receipt.get('variant_name','')} (Work Mode: {receipt.get('house_name','')}).\n\n"
-        f"{receipt.get('variant_means','')}\n\n"
-        f"Fastest win: {receipt.get('fastest_win','')}\n\n"
-        f"Want your own share-safe archetype + Work Week Receipt? Comment ‘RECEIPT’ and I’ll send the link."
-    )
+    receipt = codec.loads(raw)
+    receipt.setdefault("receipt_id", rid)
+    return HTMLResponse(sharepage.render(receipt, str(request.url), str(request.base_url) + f"b/{rid}.png"))
 
-    html = f"""
-<!doctype html>
-<html>
-<head>
-  <link rel="preconnect" href="https://fonts.googleapis.com">
-  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-  <link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap">
-  <meta charset="utf-8"/>
-  <meta name="viewport" content="width=device-width, initial-scale=1"/>
-  <title>Work Mode Quiz Result + Receipt</title>
-  <meta property="og:title" content="My Work Week Work Mode: {variant_name}"/>
-  <meta property="og:description" content="60-second quiz • share-safe • get your badge + receipt"/>
-  <meta property="og:image" content="{badge_abs}"/>
-  <meta property="og:url" content="{page_abs}"/>
-  <meta name="twitter:card" content="summary_large_image"/>
-
-  <style>
-    body {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; background:#fafafa; margin:0; }}
-    .wrap {{ max-width: 920px; margin: 0 auto; padding: 24px; }}
-    .card {{ background:#fff; border:1px solid #e6e6e6; border-radius: 18px; padding: 18px; }}
-    img {{ width:100%; height:auto; border-radius: 12px; border:1px solid #eee; }}
-    .row {{ display:flex; gap:12px; flex-wrap:wrap; margin-top: 12px; }}
-    button, input, textarea {{ font-size:16px; padding:12px 14px; border-radius:12px; border:1px solid #ddd; }}
-    button {{ background:#111; color:#fff; border:none; cursor:pointer; }}
-    .muted {{ color:#666; font-size: 14px; }}
-    .grid {{ display:grid; grid-template-columns: repeat(auto-fit, minmax(240px, 1fr)); gap: 10px; margin-top: 14px; }}
-    .mini {{ border:1px solid #eee; border-radius:14px; padding: 12px; }}
-    .mini h4 {{ margin:0 0 6px 0; font-size:14px; }}
-    .mini div {{ font-size:13px; color:#333; margin-bottom: 6px; }}
-    .two {{ display:grid; grid-template-columns: 1fr; gap: 12px; }}
-    @media (min-width: 860px) {{ .two {{ grid-template-columns: 1fr 1fr; }} }}
-    textarea {{ width: 100%; min-height: 120px; }}
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <div class="card">
-      <h2 style="margin:0 0 10px 0;">Your Work Mode Quiz Result + Receipt</h2>
-      <div class="muted">Share-safe. No message titles/subjects/names. Ranges + normalized labels only.</div>
-
-      <div class="two" style="margin-top:12px;">
-        <div>
-          <h3 style="margin:0 0 8px 0;">LinkedIn Badge (best for posting)</h3>
-          <img src="/b/{rid}.png" alt="Badge image"/>
-          <div class="row">
-            <a href="/b/{rid}.png" download><button>Download badge</button></a>
-            <button onclick="navigator.clipboard.writeText(document.getElementById('cap').value)">Copy LinkedIn caption</button>
-          </div>
-          <div style="height:10px;"></div>
-          <textarea id="cap">{caption_plain}</textarea>
-          <div class="muted" style="margin-top:8px;">Tip: post the badge + caption. Ask a question (e.g., “What’s your Work Mode?”).</div>
-        </div>
-
-        <div>
-          <h3 style="margin:0 0 8px 0;">Full Receipt (proof + plan)</h3>
-          <img src="/i/{rid}.png" alt="Receipt image"/>
-          <div class="row">
-            <a href="/i/{rid}.png" download><button>Download receipt</button></a>
-            <button onclick="navigator.clipboard.writeText(window.location.href)">Copy link</button>
-            <a href="/"><button style="background:#2b2b2b;">Make yours</button></a>
-          </div>
-        </div>
-      </div>
-
-      <div style="height:18px;"></div>
-      <h3 style="margin:0 0 8px 0;">Stay close to the launch</h3>
-      <div class="muted" style="margin-bottom:10px;">One email. Choose what you want. No spam.</div>
-      <div class="row">
-        <input id="email" placeholder="you@example.com" style="flex:1; min-width:240px;"/>
-        <button onclick="signup()">Notify me at launch</button>
-      </div>
-      <div id="msg" class="muted" style="margin-top:8px;"></div>
-
-      <div style="height:18px;"></div>
-      <h3 style="margin:0 0 8px 0;">Full picture (what Maria could do)</h3>
-      <div class="muted">Cheat sheet preview—based on other common patterns.</div>
-      <div class="grid">{cards_html}</div>
-    </div>
-  </div>
-<script>
-async function signup() {{
-  const email = document.getElementById('email').value;
-  const res = await fetch('/api/subscribe', {{
-    method:'POST',
-    headers:{{'Content-Type':'application/json'}},
-    body: JSON.stringify({{
-      email,
-      receipt_id: '{rid}',
-      house: '{receipt.get("house_key","")}',
-      variant: '{receipt.get("variant_key","")}',
-      top_areas: {json.dumps(top2)}
-    }})
-  }});
-  const data = await res.json();
-  const msg = document.getElementById('msg');
-  msg.textContent = data.ok ? "You’re on the list. We’ll email you at launch." : (data.error || "Something went wrong.");
-}}
-</script>
-</body>
-</html>
-"""
-    return HTMLResponse(html)
+SVG_HEADERS = {"Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'"}
 
-@app.get("/i/{rid}.png")
-def receipt_image(rid: str):
-    p = IMAGES / f"{rid}.png"
-    if not p.exists():
+async def _image(kind: str, rid: str, ext: str):
+    if not layout.valid_id(rid):
         return JSONResponse({"error":"Not found"}, status_code=404)
-    return FileResponse(str(p), media_type="image/png")
+    store = _store()
+    key = f"{kind}/{rid}.{ext}"
+    data = await store.get(key)
+    job = _RENDERS.get(rid) if data is None else None
+    if job is not None and key in progress.job_keys(rid):
+        # still rendering in the background; wait for it rather than race it
+        done, _ = await asyncio.wait({job.task}, timeout=progress.STREAM_TIMEOUT)
+        if not done:
+            return admission.overloaded()
+        data = await store.get(key)
+    if data is None:
+        raw = await store.get(f"receipts/{rid}.json")
+        if raw is not None:
+            if ext == "svg":
+                data = await asyncio.to_thread(_render_blob, kind, ext, codec.loads(raw))
+            elif not await ADMISSION.acquire_render():
+                return admission.overloaded()
+            else:
+                try:
+                    data = await asyncio.to_thread(_render_blob, kind, ext, codec.loads(raw))
+                finally:
+                    ADMISSION.release_render()
+            await store.put(key, data)
+    if data is None:
+        return JSONResponse({"error":"Not found"}, status_code=404)
+    if ext == "svg":
+        return Response(data, media_type="image/svg+xml", headers=SVG_HEADERS)
+    return Response(data, media_type="image/png")
+
+@app.get("/i/{rid}.png")
+async def receipt_image(rid: str):
+    return await _image("images", rid, "png")
 
 @app.get("/b/{rid}.png")
-def badge_image(rid: str):
-    p = BADGES / f"{rid}.png"
-    if not p.exists():
-        return JSONResponse({"error":"Not found"}, status_code=404)
-    return FileResponse(str(p), media_type="image/png")
\ No newline at end of file
+async def badge_image(rid: str):
+    return await _image("badges", rid, "png")
+
+@app.get("/i/{rid}.svg")
+async def receipt_svg(rid: str):
+    return await _image("images", rid, "svg")
+
+@app.get("/b/{rid}.svg")
+async def badge_svg(rid: str):
+    return await _image("badges", rid, "svg")
\ No newline at end of file
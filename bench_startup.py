@@ -0,0 +1,79 @@
+"""Startup benchmark: import time, time-to-bind and time-to-ready.
+
+    python bench_startup.py [--runs 5]
+
+Each run starts a fresh interpreter so nothing is cached between runs.
+"""
+from __future__ import annotations
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _import_time() -> float:
+    code = "import time; t=time.perf_counter(); import app; print(time.perf_counter()-t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+def _boot_times(timeout: float = 60.0) -> tuple[float, float]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/readyz"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE, env=dict(os.environ),
+    )
+    bound = ready = 0.0
+    try:
+        while time.perf_counter() - t0 < timeout:
+            code = _status(url)
+            if code and not bound:
+                bound = time.perf_counter() - t0
+            if code == 200:
+                ready = time.perf_counter() - t0
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return bound, ready
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    imports = [_import_time() for _ in range(args.runs)]
+    boots = [_boot_times() for _ in range(args.runs)]
+
+    def fmt(xs):
+        return f"median {statistics.median(xs)*1000:7.1f} ms   min {min(xs)*1000:7.1f} ms   max {max(xs)*1000:7.1f} ms"
+
+    print(f"import app      {fmt(imports)}")
+    print(f"first response  {fmt([b for b, _ in boots])}")
+    print(f"ready (/readyz) {fmt([r for _, r in boots])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Text-drawing benchmark: ImageDraw.text vs the glyph atlas (glyphs.py).
+
+    python bench_text.py [--receipts 50] [--rounds 3]
+
+Renders receipt and badge PNGs for a fixed set of random surveys, once with
+GLYPH_ATLAS off and once on, and reports per image the time spent in text()
+calls (measured the way tracing does, see renderer._TimedDraw) and the whole
+render. The first round per mode is a warm-up and is not counted.
+"""
+from __future__ import annotations
+import argparse
+import io
+import itertools
+import random
+import time
+
+import renderer
+import tracing
+from receipt_engine import SURVEY_OPTIONS, build_receipt
+
+def _receipts(n: int):
+    keys = list(SURVEY_OPTIONS)
+    combos = list(itertools.product(*SURVEY_OPTIONS.values()))
+    return [build_receipt(dict(zip(keys, c))) for c in random.Random(0).sample(combos, n)]
+
+def _run(receipts, fn, atlas: bool, rounds: int):
+    renderer._ATLAS = atlas
+    for r in receipts:
+        fn(r, io.BytesIO())
+    span = tracing.Span("bench", "0")
+    t0 = time.perf_counter()
+    with span:
+        for _ in range(rounds):
+            for r in receipts:
+                fn(r, io.BytesIO())
+    n = rounds * len(receipts)
+    a = span.attributes
+    return a["text.ms"] / n, (time.perf_counter() - t0) * 1000 / n, a["text.calls"] / n
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--receipts", type=int, default=50)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+    renderer.warm_up()
+    receipts = _receipts(args.receipts)
+    print(f"{'image':8} {'mode':10} {'text() calls':>12} {'text ms':>9} {'render ms':>10}")
+    for fn in (renderer.render_receipt_png, renderer.render_badge_png):
+        name = fn.__name__.split("_")[1]
+        base = None
+        for atlas in (False, True):
+            text_ms, total_ms, calls = _run(receipts, fn, atlas, args.rounds)
+            mode = "atlas" if atlas else "ImageDraw"
+            speedup = f"  text {base[0] / text_ms:.1f}x, render {base[1] / total_ms:.2f}x" if base else ""
+            print(f"{name:8} {mode:10} {calls:12.0f} {text_ms:9.2f} {total_ms:10.1f}{speedup}")
+            base = base or (text_ms, total_ms)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check that glyph-atlas text (glyphs.py) is pixel-identical to ImageDraw.text.
+
+    python check_glyphs.py               # every variant plus 200 random surveys
+    python check_glyphs.py --samples 2000
+
+For each font the renderers use: every character and character pair of
+glyphs.CHARSET is measured both ways, and drawn both ways on blank lines.
+Then receipt and badge PNGs are rendered with GLYPH_ATLAS on and off and
+compared pixel by pixel. Exits non-zero on the first difference.
+"""
+from __future__ import annotations
+import argparse
+import io
+import itertools
+import random
+import sys
+import time
+
+from PIL import Image, ImageChops, ImageDraw
+
+import glyphs
+import renderer
+from receipt_engine import SURVEY_OPTIONS, VARIANTS, build_receipt
+
+def _fail(msg: str):
+    print(f"MISMATCH {msg}")
+    sys.exit(1)
+
+def _surveys(samples: int):
+    """`samples` random surveys, plus one for each variant they miss."""
+    keys = list(SURVEY_OPTIONS)
+    combos = list(itertools.product(*SURVEY_OPTIONS.values()))
+    random.Random(0).shuffle(combos)
+    seen = set()
+    for i, combo in enumerate(combos):
+        if i >= samples and len(seen) == len(VARIANTS):
+            return
+        survey = dict(zip(keys, combo))
+        variant = build_receipt(survey)["variant_key"]
+        if i < samples or variant not in seen:
+            seen.add(variant)
+            yield survey
+
+def check_fonts():
+    n = 0
+    for bold, sizes in renderer.FONT_SIZES.items():
+        for size in sizes:
+            font = renderer._font(size, bold=bold)
+            a = glyphs.atlas(font)
+            if a is None:
+                print(f"skipping {font}: not a basic-layout FreeType font")
+                continue
+            chars = glyphs.CHARSET
+            for text in itertools.chain(chars, (x + y for x in chars for y in chars)):
+                if a.length(text) != font.getlength(text):
+                    _fail(f"length {text!r} at {size}{'b' if bold else ''}: {a.length(text)} != {font.getlength(text)}")
+            lines = [chars, chars[::-1]] + ["".join(random.Random(size).sample(chars, len(chars))) for _ in range(20)]
+            for text in lines:
+                w = int(font.getlength(text)) + 2 * size
+                ref = Image.new("RGB", (w, 3 * size), renderer.PAPER)
+                got = ref.copy()
+                ImageDraw.Draw(ref).text((size, size), text, font=font, fill=renderer.INK)
+                glyphs.AtlasDraw(got).text((size, size), text, font=font, fill=renderer.INK)
+                if ImageChops.difference(ref, got).getbbox():
+                    _fail(f"text {text!r} at {size}{'b' if bold else ''}")
+            n += 1
+    return n
+
+def _png(fn, receipt, atlas: bool) -> Image.Image:
+    renderer._ATLAS = atlas
+    buf = io.BytesIO()
+    fn(receipt, buf)
+    buf.seek(0)
+    return Image.open(buf).convert("RGB")
+
+def check_images(samples: int) -> int:
+    n = 0
+    for survey in _surveys(samples):
+        receipt = build_receipt(survey)
+        receipt["receipt_id"] = "check000"
+        for fn in (renderer.render_receipt_png, renderer.render_badge_png):
+            bbox = ImageChops.difference(_png(fn, receipt, False), _png(fn, receipt, True)).getbbox()
+            if bbox:
+                _fail(f"{fn.__name__} for {survey}: differs in {bbox}")
+            n += 1
+    return n
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--samples", type=int, default=200)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    fonts = check_fonts()
+    images = check_images(args.samples)
+    print(f"glyph atlas matches ImageDraw.text: {fonts} fonts, {images} images "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+if __name__ == "__main__":
+    main()
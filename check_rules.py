@@ -0,0 +1,118 @@
+"""Check that static/scoring.js agrees with receipt_engine.build_receipt.
+
+    python check_rules.py          # every combination of SURVEY_OPTIONS
+    python check_rules.py --node /path/to/node    # or set NODE
+
+Runs the published rules artifact through the JS evaluator under Node and
+compares each result (minus mode/created_at) with the server's, via a hash
+of canonical JSON per input. Exits non-zero on the first mismatch, printing
+both sides, or if Node is not installed. tests/test_rules.py runs the same
+check under pytest and skips it when Node is missing.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from receipt_engine import SURVEY_OPTIONS, build_receipt, rules
+
+BASE = Path(__file__).resolve().parent
+
+# Reads the rules on stdin. "all": one hash per SURVEY_OPTIONS combination,
+# last field varying fastest (itertools.product order). "one": the full
+# result for the survey given as argv[3].
+_DRIVER = r"""
+const crypto = require('crypto');
+const { evaluate } = require(process.argv[1]);
+const canon = (v) => Array.isArray(v) ? '[' + v.map(canon).join(',') + ']'
+  : (v && typeof v === 'object') ? '{' + Object.keys(v).sort().map(k => JSON.stringify(k) + ':' + canon(v[k])).join(',') + '}'
+  : JSON.stringify(v);
+let input = '';
+process.stdin.on('data', d => input += d).on('end', () => {
+  const R = JSON.parse(input);
+  if(process.argv[2] === 'one'){
+    process.stdout.write(canon(evaluate(R, JSON.parse(process.argv[3]))) + '\n');
+    return;
+  }
+  const keys = Object.keys(R.survey_options), opts = keys.map(k => R.survey_options[k]);
+  const idx = keys.map(() => 0), out = [];
+  for(;;){
+    const s = {};
+    keys.forEach((k, i) => { s[k] = opts[i][idx[i]]; });
+    out.push(crypto.createHash('md5').update(canon(evaluate(R, s))).digest('hex'));
+    if(out.length >= 4096){ process.stdout.write(out.join('\n') + '\n'); out.length = 0; }
+    let i = keys.length - 1;
+    while(i >= 0 && ++idx[i] === opts[i].length){ idx[i] = 0; i--; }
+    if(i < 0) break;
+  }
+  if(out.length) process.stdout.write(out.join('\n') + '\n');
+});
+"""
+
+def expected(survey: dict, version: str) -> dict:
+    r = build_receipt(survey)
+    r.pop("mode")
+    r.pop("created_at")
+    r["top_areas"] = [list(kv) for kv in sorted(r["signals"]["scores"].items(), key=lambda kv: kv[1], reverse=True)[:2]]
+    r["rules_version"] = version
+    return r
+
+def canon(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+def check(node: str) -> Tuple[int, Optional[str]]:
+    """Compare scoring.js with build_receipt on every input: (inputs checked, first mismatch or None)."""
+    R = rules()
+    blob = json.dumps(R, ensure_ascii=False).encode("utf-8")
+    script = str(BASE / "static" / "scoring.js")
+    keys = list(SURVEY_OPTIONS)
+
+    proc = subprocess.Popen([node, "-e", _DRIVER, script, "all"],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    proc.stdin.write(blob.decode("utf-8"))
+    proc.stdin.close()
+
+    n = 0
+    for combo, line in itertools.zip_longest(itertools.product(*SURVEY_OPTIONS.values()), proc.stdout):
+        if combo is None or line is None:
+            proc.kill()
+            return n, f"length mismatch after {n} inputs"
+        survey = dict(zip(keys, combo))
+        want = canon(expected(survey, R["version"]))
+        if hashlib.md5(want.encode("utf-8")).hexdigest() != line.strip():
+            proc.kill()
+            got = subprocess.run([node, "-e", _DRIVER, script, "one", json.dumps(survey)],
+                                 input=blob, capture_output=True, check=True).stdout.decode("utf-8")
+            return n, f"MISMATCH for {survey}\n  python: {want}\n  js:     {got.strip()}"
+        n += 1
+    if proc.wait():
+        return n, f"node exited with {proc.returncode}"
+    return n, None
+
+def find_node() -> Optional[str]:
+    return os.getenv("NODE") or shutil.which("node") or shutil.which("nodejs")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--node", default=find_node())
+    args = ap.parse_args()
+    if not args.node:
+        sys.exit("node not found; install Node.js or pass --node")
+
+    t0 = time.perf_counter()
+    n, error = check(args.node)
+    if error:
+        sys.exit(error)
+    print(f"rules {rules()['version']}: scoring.js matches build_receipt on all {n} inputs "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+if __name__ == "__main__":
+    main()
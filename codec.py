@@ -0,0 +1,31 @@
+"""Fast JSON codec: orjson when installed, stdlib json otherwise.
+
+Used for response encoding and receipt/subscriber persistence. Output is
+compact UTF-8 bytes in both cases.
+"""
+from __future__ import annotations
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse as _JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+class JSONResponse(_JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
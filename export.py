@@ -0,0 +1,145 @@
+"""Static export of share pages, so share traffic can be served by a CDN.
+
+Writes a tree any static file server can serve as-is:
+
+    <EXPORT_DIR>/r/<rid>/index.html   share page (relative links)
+    <EXPORT_DIR>/i/<rid>.png|.svg     receipt images
+    <EXPORT_DIR>/b/<rid>.png|.svg     badges
+    <EXPORT_DIR>/static/...           copy of static/
+    <EXPORT_DIR>/index.html           the quiz
+
+With EXPORT_DIR set the app exports each new receipt right after it is saved
+and refreshes static/ at startup. EXPORT_BASE_URL (the public origin of the
+tree) makes og:image/og:url absolute, which LinkedIn needs; EXPORT_API_ROOT
+points the page's subscribe call at the app (default: same origin).
+
+    python export.py                  # export every stored receipt not yet exported
+    python export.py --force --prune  # rewrite everything, drop pages of deleted receipts
+"""
+from __future__ import annotations
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import codec
+import layout
+import sharepage
+import storage
+
+BASE = Path(__file__).resolve().parent
+STATIC = BASE / "static"
+
+# key template in the store -> path in the export tree
+ASSETS = {
+    "images/{rid}.svg": "i/{rid}.svg",
+    "images/{rid}.png": "i/{rid}.png",
+    "badges/{rid}.svg": "b/{rid}.svg",
+    "badges/{rid}.png": "b/{rid}.png",
+}
+
+def _write(path: Path, data: bytes):
+    # world-readable: the tree is served as-is by a static file server
+    layout.write_atomic(path, data, mode=0o644)
+
+class Exporter:
+    def __init__(self, out: Path, base_url: str = "", api_root: str = "/"):
+        self.out = Path(out)
+        self.base_url = base_url.rstrip("/")
+        self.api_root = api_root
+
+    def page_path(self, rid: str) -> Path:
+        return self.out / "r" / rid / "index.html"
+
+    def export_static(self):
+        for src in STATIC.rglob("*"):
+            if src.is_file():
+                _write(self.out / "static" / src.relative_to(STATIC), src.read_bytes())
+        _write(self.out / "index.html", (STATIC / "index.html").read_bytes())
+
+    def export_receipt(self, store, rid: str) -> bool:
+        """Write one share page and its images. False if the receipt does not exist."""
+        raw = store.read(f"receipts/{rid}.json") if layout.valid_id(rid) else None
+        if raw is None:
+            return False
+        receipt = codec.loads(raw)
+        receipt.setdefault("receipt_id", rid)
+        for key, dest in ASSETS.items():
+            key = key.format(rid=rid)
+            data = store.read(key)
+            if data is None:
+                # e.g. the receipt PNG, which the app renders lazily
+                import renderer
+
+                ns, _, ext = storage.split_key(key)
+                data = renderer.render_blob(ns, ext[1:], receipt)
+                store.write(key, data)
+            _write(self.out / dest.format(rid=rid), data)
+        # page last, so it never links to an image that is not there yet
+        if self.base_url:
+            page_url, badge_url = f"{self.base_url}/r/{rid}/", f"{self.base_url}/b/{rid}.png"
+        else:
+            page_url, badge_url = f"../../r/{rid}/", f"../../b/{rid}.png"
+        html = sharepage.render(receipt, page_url, badge_url, root="../../", api_root=self.api_root)
+        _write(self.page_path(rid), html.encode("utf-8"))
+        return True
+
+    def prune(self, store) -> int:
+        """Remove exported pages and images whose receipt is gone. Returns pages removed."""
+        n = 0
+        pages = self.out / "r"
+        for d in pages.iterdir() if pages.is_dir() else ():
+            rid = d.name
+            if not layout.valid_id(rid) or store.contains(f"receipts/{rid}.json"):
+                continue
+            shutil.rmtree(d, ignore_errors=True)
+            for dest in ASSETS.values():
+                try:
+                    (self.out / dest.format(rid=rid)).unlink()
+                except FileNotFoundError:
+                    pass
+            n += 1
+        return n
+
+def from_env() -> Optional[Exporter]:
+    out = os.getenv("EXPORT_DIR", "").strip()
+    if not out:
+        return None
+    return Exporter(
+        Path(out),
+        base_url=os.getenv("EXPORT_BASE_URL", "").strip(),
+        api_root=os.getenv("EXPORT_API_ROOT", "/").strip() or "/",
+    )
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Export share pages as a static site")
+    ap.add_argument("--out", type=Path, default=None, help="defaults to $EXPORT_DIR")
+    ap.add_argument("--base-url", default=None, help="public origin of the export (defaults to $EXPORT_BASE_URL)")
+    ap.add_argument("--force", action="store_true", help="re-export pages that already exist")
+    ap.add_argument("--prune", action="store_true", help="remove pages whose receipt was deleted")
+    args = ap.parse_args()
+
+    exporter = from_env()
+    if args.out is not None:
+        exporter = Exporter(args.out, exporter.base_url if exporter else "", exporter.api_root if exporter else "/")
+    if exporter is None:
+        ap.error("set EXPORT_DIR or pass --out")
+    if args.base_url is not None:
+        exporter.base_url = args.base_url.rstrip("/")
+
+    store = storage.get_store()
+    t0 = time.perf_counter()
+    exporter.export_static()
+    done = skipped = 0
+    for key, _ in store.scan("receipts/"):
+        _, rid, _ = storage.split_key(key)
+        if not args.force and exporter.page_path(rid).exists():
+            skipped += 1
+            continue
+        done += exporter.export_receipt(store, rid)
+    pruned = exporter.prune(store) if args.prune else 0
+    print(f"exported {done} pages ({skipped} already there, {pruned} pruned) "
+          f"to {exporter.out} in {time.perf_counter() - t0:.1f}s")
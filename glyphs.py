@@ -0,0 +1,138 @@
+"""Glyph atlas: text for the PNG renderers without re-rasterizing every glyph.
+
+`ImageDraw.text` asks FreeType to load and render each glyph of the string on
+every call. A `GlyphAtlas` keeps, per font (face + size), the rendered mask,
+bitmap offset and advance of every glyph it has drawn, plus the kerning of
+every pair, and composes a line's mask from those. Whole-line masks are kept
+too, since labels and footers repeat on every image.
+
+Output is pixel-identical to `ImageDraw.text`: glyphs are placed on the same
+26.6 fixed-point pen positions (advance + kerning, as Pillow's basic layout
+computes them) and merged with the same "over" blend before the line is
+painted with its colour in one paste. Masks do not depend on colour, so one
+atlas per font serves every fill. `python check_glyphs.py` verifies the
+identity; `python bench_text.py` measures it.
+
+Only what the renderers use is handled here: basic-layout FreeType fonts,
+single lines, RGB images, whole-pixel positions. Anything else (raqm layout,
+anchors, strokes, newlines, fractional x/y) goes to Pillow as before.
+"""
+from __future__ import annotations
+import string
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# drawn up front by `preload`; anything else is added on first use
+CHARSET = string.ascii_letters + string.digits + string.punctuation + " ’‘“”•–—…"
+
+LINE_CACHE = 1024
+
+Glyph = Tuple[int, int, int, Optional[Image.Image]]  # advance (26.6), dx, dy, mask
+
+def _advance(font: ImageFont.FreeTypeFont, text: str) -> int:
+    return round(font.getlength(text) * 64)
+
+class GlyphAtlas:
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self._glyphs: Dict[str, Glyph] = {}
+        self._kerning: Dict[str, int] = {}
+        self.mask = lru_cache(maxsize=LINE_CACHE)(self._compose)
+
+    def glyph(self, ch: str) -> Glyph:
+        g = self._glyphs.get(ch)
+        if g is None:
+            m, (dx, dy) = self.font.getmask2(ch, "L")
+            w, h = m.size
+            mask = Image.frombuffer("L", (w, h), bytes(m), "raw", "L", 0, 1) if w and h else None
+            g = self._glyphs[ch] = (_advance(self.font, ch), dx, dy, mask)
+        return g
+
+    def kerning(self, a: str, b: str) -> int:
+        pair = a + b
+        k = self._kerning.get(pair)
+        if k is None:
+            k = self._kerning[pair] = _advance(self.font, pair) - self.glyph(a)[0] - self.glyph(b)[0]
+        return k
+
+    def preload(self, chars: str = CHARSET):
+        for ch in chars:
+            self.glyph(ch)
+
+    def length(self, text: str) -> float:
+        """Same as `font.getlength(text)`."""
+        pen, prev = 0, ""
+        for ch in text:
+            if prev:
+                pen += self.kerning(prev, ch)
+            pen += self.glyph(ch)[0]
+            prev = ch
+        return pen / 64
+
+    def _compose(self, text: str) -> Optional[Tuple[int, int, Image.Image]]:
+        """Mask for one line as (dx, dy, mask) from the pen origin, or None if blank."""
+        placed = []
+        pen, prev = 0, ""
+        for ch in text:
+            if prev:
+                pen += self.kerning(prev, ch)
+            adv, dx, dy, mask = self.glyph(ch)
+            if mask is not None:
+                placed.append(((pen + 32 >> 6) + dx, dy, mask))
+            pen += adv
+            prev = ch
+        if not placed:
+            return None
+        x0 = min(x for x, _, _ in placed)
+        y0 = min(y for _, y, _ in placed)
+        x1 = max(x + m.width for x, _, m in placed)
+        y1 = max(y + m.height for _, y, m in placed)
+        line = Image.new("L", (x1 - x0, y1 - y0), 0)
+        for x, y, m in placed:
+            # filling 255 through the glyph mask is FreeType's src-over merge
+            line.paste(255, (x - x0, y - y0), m)
+        return x0, y0, line
+
+_ATLASES: Dict[Tuple[str, int, int], GlyphAtlas] = {}
+_LOCK = threading.Lock()
+
+def atlas(font) -> Optional[GlyphAtlas]:
+    """The atlas for `font`, or None if the font is not one it can reproduce."""
+    if not isinstance(font, ImageFont.FreeTypeFont) or font.layout_engine != ImageFont.Layout.BASIC:
+        return None
+    key = (font.path, font.size, font.index)
+    a = _ATLASES.get(key)
+    if a is None:
+        with _LOCK:
+            a = _ATLASES.get(key)
+            if a is None:
+                a = _ATLASES[key] = GlyphAtlas(font)
+    return a
+
+def _whole(v) -> Optional[int]:
+    i = int(v)
+    return i if i == v else None
+
+class AtlasDraw(ImageDraw.ImageDraw):
+    """`ImageDraw` whose text() and textlength() go through the glyph atlas."""
+
+    def text(self, xy, text, fill=None, font=None, *args, **kwargs):
+        a = atlas(font) if not args and not kwargs and fill is not None and self.mode == "RGB" else None
+        if a is None or not isinstance(text, str) or "\n" in text or "\r" in text:
+            return super().text(xy, text, fill, font, *args, **kwargs)
+        x, y = _whole(xy[0]), _whole(xy[1])
+        if x is None or y is None:
+            return super().text(xy, text, fill, font)
+        line = a.mask(text)
+        if line is not None:
+            dx, dy, mask = line
+            self._image.paste(fill, (x + dx, y + dy), mask)
+
+    def textlength(self, text, font=None, *args, **kwargs):
+        a = atlas(font) if not args and not kwargs else None
+        if a is None or not isinstance(text, str) or "\n" in text:
+            return super().textlength(text, font, *args, **kwargs)
+        return a.length(text)
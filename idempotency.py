@@ -0,0 +1,125 @@
+"""Idempotent quiz submissions.
+
+A POST to /api/receipt-lite is keyed by its ``Idempotency-Key`` header or,
+failing that, by a hash of the canonical survey plus the browser's
+``client_token``. Within IDEMPOTENCY_TTL seconds (default 600) a repeat of
+the same key gets the original response back without re-scoring or
+re-rendering; a repeat that arrives while the first is still rendering waits
+for it. Requests with neither a key nor a token are never deduplicated.
+A header key is bound to the answers it was first sent with: reusing it
+with different answers gets a 422 instead of someone else's receipt.
+Replays are answered before rate limiting, so a retry never gets a 429 for a
+response that is already cached.
+
+The cache is per process and bounded (IDEMPOTENCY_MAX_ENTRIES, default
+10000). Errors are not cached, so a failed submission can be retried.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import codec
+from codec import JSONResponse
+
+MAX_KEY_LENGTH = 128
+
+def request_key(request, survey) -> Optional[Tuple[str, str]]:
+    """(cache key, hash of the answers) for a submission, or None if it cannot
+    be told apart from another user's."""
+    canonical = codec.dumps(survey.model_dump(exclude={"client_token"}))
+    payload = hashlib.sha256(canonical).hexdigest()
+    header = request.headers.get("idempotency-key", "").strip()
+    if header and len(header) <= MAX_KEY_LENGTH:
+        return "k:" + header, payload
+    token = getattr(survey, "client_token", "")
+    if not token:
+        return None
+    return "s:" + hashlib.sha256(token.encode("utf-8") + b"\0" + canonical).hexdigest(), payload
+
+def key_reused() -> JSONResponse:
+    return JSONResponse(
+        {"ok": False, "error": "This Idempotency-Key was already used with different answers."},
+        status_code=422,
+    )
+
+class IdempotencyCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._done: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.counters: Dict[str, int] = {"replayed": 0, "joined": 0, "conflicts": 0}
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, Any]]:
+        """(payload hash, result) kept for `key`, or None."""
+        hit = self._done.get(key)
+        if hit is None:
+            return None
+        expires, payload, value = hit
+        if expires < time.monotonic():
+            del self._done[key]
+            return None
+        return payload, value
+
+    def _remember(self, key: str, payload: str, value: Any):
+        self._done[key] = (time.monotonic() + self.ttl, payload, value)
+        self._done.move_to_end(key)
+        while len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    def seen(self, key: str) -> bool:
+        """True if `run(key, ...)` would replay or join rather than compute."""
+        return key in self._inflight or self._lookup(key) is not None
+
+    def conflicts(self, key: str, payload: str) -> bool:
+        """True (and counted) if `key` is in use for a different payload."""
+        pending = self._inflight.get(key)
+        hit = self._lookup(key) if pending is None else pending
+        if hit is None or hit[0] == payload:
+            return False
+        self.counters["conflicts"] += 1
+        return True
+
+    async def run(self, key: str, make: Callable[[], Awaitable[Any]], ok: Callable[[Any], bool],
+                  payload: str = "") -> Tuple[Any, bool]:
+        """Result of `make()` for `key`, computed at most once per TTL. Returns (result, replayed).
+
+        Results for which `ok(result)` is false are handed back but not kept.
+        Callers check `conflicts(key, payload)` first.
+        """
+        while True:
+            hit = self._lookup(key)
+            if hit is not None:
+                self.counters["replayed"] += 1
+                return hit[1], True
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.counters["joined"] += 1
+            value = await asyncio.shield(pending[1])
+            if value is not None:
+                return value, True
+            # the first attempt failed; try again ourselves
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (payload, fut)
+        value = None
+        try:
+            result = await make()
+            if ok(result):
+                value = result
+                self._remember(key, payload, value)
+            return result, False
+        finally:
+            del self._inflight[key]
+            fut.set_result(value)
+
+def from_env() -> IdempotencyCache:
+    return IdempotencyCache(
+        ttl=float(os.getenv("IDEMPOTENCY_TTL", "600")),
+        max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+    )
@@ -0,0 +1,101 @@
+"""On-disk layout for receipts and rendered images.
+
+Files are sharded by the first two characters of the receipt id
+(``data/receipts/3f/3f9a21c0.json``) so no directory grows past a few
+thousand entries. Files from the old flat layout are still found on read;
+``python layout.py migrate`` moves them into their shards.
+"""
+from __future__ import annotations
+import argparse
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+BASE = Path(__file__).resolve().parent
+
+_ID = re.compile(r"^[0-9A-Za-z_-]{2,64}$")
+
+def data_dir() -> Path:
+    return Path(os.getenv("DATA_DIR", "") or BASE / "data")
+
+def valid_id(rid: str) -> bool:
+    return bool(_ID.match(rid or ""))
+
+def shard_path(root: Path, rid: str, suffix: str) -> Path:
+    if not valid_id(rid):
+        raise ValueError(f"invalid receipt id: {rid!r}")
+    return root / rid[:2] / f"{rid}{suffix}"
+
+def write_atomic(path: Path, *chunks: bytes, mode: Optional[int] = None):
+    """Write `chunks` to `path` via a temp file and rename, so readers see the
+    old file or the new one, never half of it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+def find(root: Path, rid: str, suffix: str) -> Optional[Path]:
+    """Existing file for `rid`, checking the sharded then the legacy flat path."""
+    if not valid_id(rid):
+        return None
+    for p in (shard_path(root, rid, suffix), root / f"{rid}{suffix}"):
+        if p.exists():
+            return p
+    return None
+
+def iter_files(root: Path, suffix: str) -> Iterator[Tuple[str, Path]]:
+    """Yield (rid, path) for every file under `root`, sharded or flat."""
+    if not root.exists():
+        return
+    for entry in os.scandir(root):
+        if entry.is_dir():
+            for sub in os.scandir(entry.path):
+                if sub.name.endswith(suffix) and sub.is_file():
+                    yield sub.name[: len(sub.name) - len(suffix)], Path(sub.path)
+        elif entry.name.endswith(suffix):
+            yield entry.name[: len(entry.name) - len(suffix)], Path(entry.path)
+
+def migrate(root: Path, suffix: str) -> int:
+    """Move flat `root/<rid><suffix>` files into their shard. Safe to re-run."""
+    moved = 0
+    if not root.exists():
+        return moved
+    for entry in os.scandir(root):
+        if not entry.is_file() or not entry.name.endswith(suffix):
+            continue
+        rid = entry.name[: -len(suffix)]
+        if not valid_id(rid):
+            continue
+        dst = shard_path(root, rid, suffix)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(entry.path, dst)
+        moved += 1
+    return moved
+
+LAYOUT = (
+    ("receipts", ".json"),
+    ("images", ".png"), ("images", ".svg"),
+    ("badges", ".png"), ("badges", ".svg"),
+)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sharded data layout tools")
+    ap.add_argument("command", choices=["migrate"])
+    ap.add_argument("--data-dir", type=Path, default=None, help="defaults to $DATA_DIR or ./data")
+    args = ap.parse_args()
+    data = args.data_dir or data_dir()
+    for name, suffix in LAYOUT:
+        print(f"{name}: moved {migrate(data / name, suffix)} files")
@@ -0,0 +1,283 @@
+"""Self-contained load generator for the receipt app.
+
+    python loadtest.py --concurrency 32 --duration 30
+    python loadtest.py --url http://127.0.0.1:8000 --concurrency 64
+
+Without --url it starts its own uvicorn (``--workers``) against a temporary
+DATA_DIR, plus a local SMTP sink for /api/optin, so a run needs no network
+and leaves ./data untouched. Quiz payloads are drawn from
+``receipt_engine.SURVEY_OPTIONS``; share pages and images are fetched for
+receipts created during the run. Prints throughput and p50/p95/p99 per route.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from receipt_engine import SURVEY_OPTIONS
+from smtp_sink import SMTPSink
+
+BASE = Path(__file__).resolve().parent
+
+DEFAULT_MIX = "receipt=1,page=4,receipt_png=1,badge_png=3,subscribe=0.3,optin=0.3"
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        k, _, v = part.partition("=")
+        mix[k.strip()] = float(v)
+    unknown = set(mix) - set(ROUTES)
+    if unknown:
+        raise SystemExit(f"unknown routes in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def random_survey(rng: random.Random) -> dict:
+    return {k: rng.choice(v) for k, v in SURVEY_OPTIONS.items()}
+
+def _percentile(sorted_xs: List[float], pct: float) -> float:
+    if not sorted_xs:
+        return 0.0
+    i = max(0, min(len(sorted_xs) - 1, int(round(pct / 100 * len(sorted_xs) + 0.5)) - 1))
+    return sorted_xs[i]
+
+# ---------------------------------------------------------
+# Tiny keep-alive HTTP/1.1 client (stdlib only)
+# ---------------------------------------------------------
+class _Conn:
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        for attempt in (0, 1):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                return await self._roundtrip(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    async def _roundtrip(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, bytes]:
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        if body is not None:
+            head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await self.writer.drain()
+
+        status = int((await self.reader.readuntil(b"\r\n")).split(b" ", 2)[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = b""
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                data += chunk[:-2]
+        else:
+            data = await self.reader.readexactly(int(headers.get("content-length", "0")))
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+# ---------------------------------------------------------
+# Routes
+# ---------------------------------------------------------
+class _Run:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.rids: List[str] = []
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def rid(self) -> Optional[str]:
+        return self.rng.choice(self.rids) if self.rids else None
+
+async def _receipt(conn: _Conn, run: _Run):
+    status, data = await conn.request("POST", "/api/receipt-lite", json.dumps(random_survey(run.rng)).encode())
+    if status == 200:
+        run.rids.append(json.loads(data)["receipt_id"])
+    return "POST /api/receipt-lite", status
+
+async def _page(conn: _Conn, run: _Run):
+    return "GET /r/{rid}", (await conn.request("GET", f"/r/{run.rid()}"))[0]
+
+async def _receipt_png(conn: _Conn, run: _Run):
+    return "GET /i/{rid}.png", (await conn.request("GET", f"/i/{run.rid()}.png"))[0]
+
+async def _badge_png(conn: _Conn, run: _Run):
+    return "GET /b/{rid}.png", (await conn.request("GET", f"/b/{run.rid()}.png"))[0]
+
+def _email(run: _Run) -> str:
+    return f"load{run.rng.randrange(10**9)}@example.test"
+
+async def _subscribe(conn: _Conn, run: _Run):
+    body = {
+        "email": _email(run),
+        "receipt_id": run.rid(),
+        "notify_launch": True,
+        "beta_tester": run.rng.random() < 0.3,
+        "newsletter": run.rng.random() < 0.5,
+        "source": "loadtest",
+    }
+    return "POST /api/subscribe", (await conn.request("POST", "/api/subscribe", json.dumps(body).encode()))[0]
+
+async def _optin(conn: _Conn, run: _Run):
+    body = {"email": _email(run), "notify_launch": True, "beta_tester": False, "newsletter": True}
+    return "POST /api/optin", (await conn.request("POST", "/api/optin", json.dumps(body).encode()))[0]
+
+ROUTES = {
+    "receipt": _receipt,
+    "page": _page,
+    "receipt_png": _receipt_png,
+    "badge_png": _badge_png,
+    "subscribe": _subscribe,
+    "optin": _optin,
+}
+
+async def _user(host: str, port: int, run: _Run, mix: Dict[str, float], deadline: float):
+    conn = _Conn(host, port)
+    names, weights = list(mix), list(mix.values())
+    try:
+        while time.perf_counter() < deadline:
+            name = run.rng.choices(names, weights)[0]
+            if not run.rids and name != "receipt":
+                name = "receipt"
+            t0 = time.perf_counter()
+            try:
+                label, status = await ROUTES[name](conn, run)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                label, status = name, type(e).__name__
+                conn.close()
+            run.latency[label].append(time.perf_counter() - t0)
+            if status != 200:
+                run.errors[label] += 1
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------
+# Driver
+# ---------------------------------------------------------
+async def _wait_ready(host: str, port: int, timeout: float):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        conn = _Conn(host, port)
+        try:
+            if (await conn.request("GET", "/readyz"))[0] == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        await asyncio.sleep(0.1)
+    raise SystemExit(f"server at {host}:{port} not ready after {timeout:.0f}s")
+
+def _report(run: _Run, elapsed: float, sink: Optional[SMTPSink]):
+    print(f"\n{'route':<24}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total = 0
+    for label in sorted(run.latency):
+        xs = sorted(run.latency[label])
+        total += len(xs)
+        print(
+            f"{label:<24}{len(xs):>8}{run.errors[label]:>8}{len(xs)/elapsed:>9.1f}"
+            f"{_percentile(xs, 50)*1000:>9.1f}{_percentile(xs, 95)*1000:>9.1f}"
+            f"{_percentile(xs, 99)*1000:>9.1f}{xs[-1]*1000:>9.1f}"
+        )
+    print(f"{'total':<24}{total:>8}{sum(run.errors.values()):>8}{total/elapsed:>9.1f}")
+    if sink is not None:
+        print(f"\nSMTP sink received {sink.received} messages")
+
+async def _main(args):
+    mix = _parse_mix(args.mix)
+    sink: Optional[SMTPSink] = None
+    server: Optional[subprocess.Popen] = None
+    tmp: Optional[tempfile.TemporaryDirectory] = None
+
+    if args.url:
+        u = urlsplit(args.url)
+        host, port = u.hostname or "127.0.0.1", u.port or 80
+    else:
+        sink = SMTPSink()
+        smtp_port = await sink.start()
+        tmp = tempfile.TemporaryDirectory(prefix="loadtest-")
+        host, port = "127.0.0.1", _free_port()
+        env = dict(
+            os.environ,
+            DATA_DIR=tmp.name,
+            SMTP_HOST="127.0.0.1",
+            SMTP_PORT=str(smtp_port),
+            SMTP_TLS="0",
+            SMTP_USER="",
+            SMTP_FROM="loadtest@example.test",
+            # one client IP for everything, so per-IP limits are off unless asked for
+            RATE_LIMIT_PER_MIN=os.environ.get("RATE_LIMIT_PER_MIN", "0"),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", host, "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BASE, env=env,
+        )
+
+    try:
+        await _wait_ready(host, port, args.ready_timeout)
+        run = _Run(random.Random(args.seed))
+        print(f"{args.concurrency} clients for {args.duration:.0f}s against {host}:{port}")
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(*[_user(host, port, run, mix, deadline) for _ in range(args.concurrency)])
+        _report(run, time.perf_counter() - t0, sink)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if sink is not None:
+            await sink.stop()
+        if tmp is not None:
+            tmp.cleanup()
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", help="target an already running server instead of starting one")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default: {DEFAULT_MIX})")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--ready-timeout", type=float, default=120.0)
+    asyncio.run(_main(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Request/response models for the JSON API, plus bounded body parsing.
+
+Bodies are capped before any parsing happens: an oversized Content-Length is
+rejected from the header alone, and streamed bodies stop reading at the cap.
+Valid bodies are decoded and validated in one pass by pydantic-core.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Type, TypeVar, Union
+
+from fastapi import Request
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from codec import JSONResponse
+
+SURVEY_MAX_BYTES = 4096
+SUBSCRIBE_MAX_BYTES = 4096
+OPTIN_MAX_BYTES = 2048
+
+class _In(BaseModel):
+    # The quiz posts more fields than we read; ignore the rest. Numbers sent
+    # for text fields become strings, as the untyped handlers' str() did.
+    model_config = ConfigDict(extra="ignore", str_max_length=256, str_strip_whitespace=True,
+                              coerce_numbers_to_str=True)
+
+class SurveyIn(_In):
+    meeting_hours_range: str = ""
+    meet_interrupts: str = ""
+    after_hours_hours_range: str = ""
+    email_backlog_range: str = ""
+    email_behind_freq: str = ""
+    response_pressure: str = ""
+    notif_interrupt_freq: str = ""
+    collab_people: str = ""
+    week_of: str = "Last week"
+    # random per-browser id; with the answers it keys idempotent replays
+    client_token: str = ""
+
+class SubscribeIn(_In):
+    email: str = ""
+    beta_tester: bool = False
+    newsletter: bool = False
+    notify_launch: bool = False
+    receipt_id: Optional[str] = None
+    house: Optional[str] = None
+    variant: Optional[str] = None
+    top_areas: Optional[List[Any]] = None
+    utm: Dict[str, Any] = {}
+    source: str = "unknown"
+
+class OptinIn(_In):
+    email: str = ""
+    notify_launch: bool = False
+    beta_tester: bool = False
+    newsletter: bool = False
+
+class ReceiptLiteOut(BaseModel):
+    receipt_id: str
+    receipt_url: str
+    image_url: str
+    badge_url: str
+    image_svg_url: str
+    badge_svg_url: str
+    events_url: str
+
+    house_key: str
+    house_name: str
+    house_motto: str
+    house_strength: str
+    house_shadow: str
+
+    variant_key: str
+    variant_name: str
+    variant_means: str
+    fastest_win: str
+
+    maria_actions: List[str]
+    reclaim_plan: List[Dict[str, str]]
+    cheat_sheet: Any
+
+    top_areas: List[Any]
+
+class OkOut(BaseModel):
+    ok: bool
+    error: Optional[str] = None
+
+class OptinOut(OkOut):
+    skipped: Optional[bool] = None
+    sent: Optional[bool] = None
+
+def _error(status: int, msg: str) -> JSONResponse:
+    return JSONResponse({"ok": False, "error": msg}, status_code=status)
+
+M = TypeVar("M", bound=BaseModel)
+
+async def parse_body(request: Request, model: Type[M], limit: int) -> Union[M, JSONResponse]:
+    """Read at most `limit` bytes and validate them as `model`; an error response otherwise."""
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            if int(declared) > limit:
+                return _error(413, "Request body too large.")
+        except ValueError:
+            return _error(400, "Invalid Content-Length.")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            return _error(413, "Request body too large.")
+
+    if not body.strip() or body.strip() == b"null":
+        return model()
+    try:
+        return model.model_validate_json(bytes(body))
+    except ValidationError:
+        return _error(400, "Invalid request.")
@@ -0,0 +1,305 @@
+"""Append-only pack files for rendered images.
+
+PNGs and SVGs are appended to large segment files (``packs/seg-000001.pack``)
+and located through an append-only index log (key -> segment, offset,
+length). Reads are slices of a per-process mmap of the segment, so serving an
+image costs no open/stat per request and the filesystem holds a handful of
+big files instead of millions of small ones.
+
+Deletes append a tombstone; ``compact`` rewrites segments whose dead bytes
+pass a threshold and swaps in a fresh index. Several worker processes can
+share one pack directory: writers serialize on a lock file, readers pick up
+new index records lazily.
+
+    python packstore.py import     # pack existing images/ and badges/ files
+    python packstore.py compact [--min-dead 0.3]
+    python packstore.py stats
+"""
+from __future__ import annotations
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import layout
+import storage
+
+# kind, key length, segment, offset, length, unix time
+_REC = struct.Struct("<BHIQII")
+_PUT, _DEL = 1, 2
+
+SEGMENT_BYTES = 256 * 1024 * 1024
+# how stale another process's deletes may look to this one
+REFRESH_SECONDS = 1.0
+
+Entry = Tuple[int, int, int, int]  # segment, offset, length, mtime
+
+class PackStore(storage.BlobStore):
+    def __init__(self, root: Path, segment_bytes: int = SEGMENT_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.index_path = self.root / "index.log"
+        self.index_path.touch(exist_ok=True)
+        self._index: Dict[str, Entry] = {}
+        self._index_ino = 0
+        self._index_pos = 0
+        self._refreshed = 0.0
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._mu = threading.Lock()
+        self._refresh()
+
+    # -- index ---------------------------------------------------------
+    def _seg_path(self, seg: int) -> Path:
+        return self.root / f"seg-{seg:06d}.pack"
+
+    def _refresh(self):
+        """Apply index records appended (or an index swapped in) by any process."""
+        with self._mu:
+            self._refreshed = time.monotonic()
+            try:
+                f = open(self.index_path, "rb")
+            except FileNotFoundError:
+                return
+            # stat the open file, not the path: compact may swap the index in
+            # between, and an offset into the old file means nothing in the new
+            with f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != self._index_ino:
+                    self._index, self._index_pos, self._index_ino = {}, 0, st.st_ino
+                    self._drop_maps()
+                if st.st_size <= self._index_pos:
+                    return
+                f.seek(self._index_pos)
+                buf = f.read()
+            pos = 0
+            while pos + _REC.size <= len(buf):
+                kind, klen, seg, off, length, ts = _REC.unpack_from(buf, pos)
+                end = pos + _REC.size + klen
+                if end > len(buf):
+                    break  # record still being written
+                key = buf[pos + _REC.size:end].decode("utf-8")
+                if kind == _PUT:
+                    self._index[key] = (seg, off, length, ts)
+                else:
+                    self._index.pop(key, None)
+                pos = end
+            self._index_pos += pos
+
+    def _drop_maps(self):
+        for m in self._maps.values():
+            m.close()
+        self._maps.clear()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.root / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _active_segment(self) -> Tuple[int, int]:
+        segs = sorted(int(p.stem[4:]) for p in self.root.glob("seg-*.pack"))
+        seg = segs[-1] if segs else 1
+        size = self._seg_path(seg).stat().st_size if segs else 0
+        if size >= self.segment_bytes:
+            seg, size = seg + 1, 0
+        return seg, size
+
+    def _append_index(self, records: bytes):
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, records)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _record(kind: int, key: str, seg: int = 0, off: int = 0, length: int = 0, ts: Optional[int] = None) -> bytes:
+        k = key.encode("utf-8")
+        return _REC.pack(kind, len(k), seg, off, length, int(time.time()) if ts is None else ts) + k
+
+    # -- BlobStore -----------------------------------------------------
+    def _slice(self, entry: Entry) -> bytes:
+        seg, off, length, _ = entry
+        with self._mu:
+            m = self._maps.get(seg)
+            if m is None or off + length > len(m):
+                if m is not None:
+                    m.close()
+                with open(self._seg_path(seg), "rb") as f:
+                    m = self._maps[seg] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return m[off:off + length]
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._refreshed > REFRESH_SECONDS:
+            self._refresh()
+
+    def read(self, key: str) -> Optional[bytes]:
+        self._maybe_refresh()
+        for attempt in (0, 1):
+            entry = self._index.get(key)
+            if entry is None and not attempt:
+                self._refresh()
+                continue
+            if entry is None:
+                return None
+            try:
+                return self._slice(entry)
+            except FileNotFoundError:
+                # segment compacted away by another process; reload and retry
+                self._refresh()
+        return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        # Indexed hits are an in-memory slice; not worth a thread hop.
+        self._maybe_refresh()
+        if key in self._index:
+            return self.read(key)
+        return await super().get(key)
+
+    def write(self, key: str, data: bytes):
+        with self._locked():
+            seg, off = self._active_segment()
+            with open(self._seg_path(seg), "ab") as f:
+                f.write(data)
+                # data durable before the index names it, so neither readers
+                # nor a restart after a crash find an entry ahead of its bytes
+                f.flush()
+                os.fsync(f.fileno())
+            self._append_index(self._record(_PUT, key, seg, off, len(data)))
+        self._refresh()
+
+    def remove(self, key: str):
+        with self._locked():
+            self._append_index(self._record(_DEL, key))
+        self._refresh()
+
+    def contains(self, key: str) -> bool:
+        self._maybe_refresh()
+        if key not in self._index:
+            self._refresh()
+        return key in self._index
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        self._refresh()
+        for key, (_, _, _, ts) in list(self._index.items()):
+            if key.startswith(prefix):
+                yield key, float(ts)
+
+    # -- maintenance ---------------------------------------------------
+    def stats(self) -> Dict[int, Tuple[int, int]]:
+        """segment -> (file bytes, live bytes)."""
+        self._refresh()
+        out = {int(p.stem[4:]): (p.stat().st_size, 0) for p in self.root.glob("seg-*.pack")}
+        for seg, _, length, _ in self._index.values():
+            size, live = out.get(seg, (0, 0))
+            out[seg] = (size, live + length)
+        return out
+
+    def compact(self, min_dead: float = 0.3) -> int:
+        """Rewrite sealed segments with at least `min_dead` dead bytes. Returns bytes reclaimed."""
+        with self._locked():
+            self._refresh()
+            active, _ = self._active_segment()
+            stats = self.stats()
+            victims = {
+                seg for seg, (size, live) in stats.items()
+                if seg != active and size and (size - live) / size >= min_dead
+            }
+            if not victims:
+                return 0
+            index = dict(self._index)
+            seg, off = active, self._seg_path(active).stat().st_size if self._seg_path(active).exists() else 0
+            out = open(self._seg_path(seg), "ab")
+            try:
+                for key, entry in sorted(index.items(), key=lambda kv: (kv[1][0], kv[1][1])):
+                    if entry[0] not in victims:
+                        continue
+                    data = self._slice(entry)
+                    if off >= self.segment_bytes:
+                        out.close()
+                        seg, off = seg + 1, 0
+                        out = open(self._seg_path(seg), "ab")
+                    out.write(data)
+                    index[key] = (seg, off, len(data), entry[3])
+                    off += len(data)
+                out.flush()
+                os.fsync(out.fileno())
+            finally:
+                out.close()
+            # swap in a fresh index holding only live entries
+            tmp = self.root / "index.log.tmp"
+            with open(tmp, "wb") as f:
+                f.write(b"".join(self._record(_PUT, k, *e) for k, e in index.items()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.index_path)
+            reclaimed = sum(stats[v][0] for v in victims) - sum(stats[v][1] for v in victims)
+            # picks up the new index and drops the old maps under _mu, so a
+            # read on another thread never slices a closed map
+            self._refresh()
+            for v in victims:
+                self._seg_path(v).unlink()
+        return reclaimed
+
+class PrefixRouter(storage.BlobStore):
+    """Send keys under `prefixes` to `pack`, everything else to `base`."""
+
+    def __init__(self, base: storage.BlobStore, pack: PackStore, prefixes=("images/", "badges/")):
+        self.base, self.pack, self.prefixes = base, pack, tuple(prefixes)
+
+    def _pick(self, key: str) -> storage.BlobStore:
+        return self.pack if key.startswith(self.prefixes) else self.base
+
+    def read(self, key):
+        return self._pick(key).read(key)
+
+    async def get(self, key):
+        return await self._pick(key).get(key)
+
+    def write(self, key, data):
+        self._pick(key).write(key, data)
+
+    def remove(self, key):
+        self._pick(key).remove(key)
+
+    def contains(self, key):
+        return self._pick(key).contains(key)
+
+    def scan(self, prefix):
+        return self._pick(prefix).scan(prefix)
+
+    def compact(self, min_dead: float = 0.3) -> int:
+        return self.pack.compact(min_dead)
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Image pack store tools")
+    ap.add_argument("command", choices=["import", "compact", "stats"])
+    ap.add_argument("--data-dir", type=Path, default=None, help="defaults to $DATA_DIR or ./data")
+    ap.add_argument("--min-dead", type=float, default=0.3, help="compact segments with at least this dead fraction")
+    args = ap.parse_args()
+    data = args.data_dir or layout.data_dir()
+    pack = PackStore(data / "packs")
+    if args.command == "import":
+        src = storage.LocalStore(data)
+        n = 0
+        for ns in ("images", "badges"):
+            for key, _ in src.scan(ns + "/"):
+                if not pack.contains(key):
+                    pack.write(key, src.read(key))
+                    n += 1
+        print(f"packed {n} files (originals left in place)")
+    elif args.command == "compact":
+        print(f"reclaimed {pack.compact(args.min_dead)} bytes")
+    else:
+        for seg, (size, live) in sorted(pack.stats().items()):
+            print(f"seg-{seg:06d}  {size:>12} bytes  {live / size if size else 0:6.1%} live")
@@ -0,0 +1,99 @@
+"""Render progress for receipts whose images are still being drawn.
+
+/api/receipt-lite answers as soon as the receipt is scored and stored; the
+images are rendered by a background task that records its milestones on a
+`RenderJob`. GET /api/events/{rid} streams them as Server-Sent Events:
+
+    event: badge_ready     badge SVG + PNG are in the store
+    event: receipt_ready   receipt SVG is in the store
+
+A job only lives in the worker that rendered it. Any other worker answers the
+same stream by polling the store until the images appear.
+"""
+from __future__ import annotations
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import codec
+
+# event -> store keys that must exist before it is sent
+MILESTONES = {
+    "badge_ready": ("badges/{rid}.svg", "badges/{rid}.png"),
+    "receipt_ready": ("images/{rid}.svg",),
+}
+
+def job_keys(rid: str) -> Tuple[str, ...]:
+    """Every store key a RenderJob for `rid` writes."""
+    return tuple(k.format(rid=rid) for keys in MILESTONES.values() for k in keys)
+
+POLL_INTERVAL = 0.25
+KEEPALIVE = 15.0
+STREAM_TIMEOUT = 60.0
+
+def event_data(name: str, rid: str) -> dict:
+    if name == "badge_ready":
+        return {"receipt_id": rid, "badge_svg_url": f"/b/{rid}.svg", "badge_url": f"/b/{rid}.png"}
+    return {"receipt_id": rid, "image_svg_url": f"/i/{rid}.svg", "image_url": f"/i/{rid}.png"}
+
+def sse(name: str, data: dict) -> bytes:
+    return f"event: {name}\ndata: ".encode("utf-8") + codec.dumps(data) + b"\n\n"
+
+class RenderJob:
+    def __init__(self, rid: str):
+        self.rid = rid
+        self.events: List[str] = []
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # wake every current waiter; later waiters get a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def emit(self, name: str):
+        self.events.append(name)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for the next milestone; False on timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            for name in self.events[sent:]:
+                yield sse(name, event_data(name, self.rid))
+            sent = len(self.events)
+            if self.done:
+                return
+            if not await self.wait(KEEPALIVE):
+                yield b": keep-alive\n\n"
+
+async def poll_store(store, rid: str, timeout: float = STREAM_TIMEOUT) -> AsyncIterator[bytes]:
+    """Same events as `RenderJob.stream`, for a render running in another worker (or finished)."""
+    pending: Dict[str, Tuple[str, ...]] = {
+        name: tuple(k.format(rid=rid) for k in keys) for name, keys in MILESTONES.items()
+    }
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    last = loop.time()
+    while pending:
+        for name, keys in list(pending.items()):
+            if all(await asyncio.gather(*(store.exists(k) for k in keys))):
+                del pending[name]
+                yield sse(name, event_data(name, rid))
+        if not pending or loop.time() > deadline:
+            return
+        if loop.time() - last > KEEPALIVE:
+            last = loop.time()
+            yield b": keep-alive\n\n"
+        await asyncio.sleep(POLL_INTERVAL)
@@ -1,6 +1,9 @@
 from __future__ import annotations
+from functools import lru_cache
 from typing import Dict, List, Tuple, Any
 import datetime as dt
+import hashlib
+import json
 
 HOUSES: Dict[str, Dict[str, str]] = {
     "CALENDAR": {
@@ -122,6 +125,23 @@ CHEAT_SHEET: List[Dict[str, str]] = [
     {"title":"Onboarding / knowledge loss","signal":"Same questions repeating","maria":"Build living SOPs + searchable decision history","outcome":"Faster ramp, retained institutional memory"},
 ]
 
+# ---------------------------------------------------------
+# Scoring tables. Everything the scoring functions below need is data, so
+# rules() can publish it for the quiz page's evaluator (static/scoring.js).
+# Area scores run 0..3.
+# ---------------------------------------------------------
+AREAS = ["MEETINGS", "FRAGMENTATION", "AFTER_HOURS", "MESSAGE_PRESSURE", "RESPONSE_LAG", "BOTTLENECKS"]
+
+LEVELS = ["low", "moderate", "high", "severe"]
+RISK_LABELS = ["Low", "Moderate", "High", "High"]
+
+# range midpoint -> 0..3: <= c1 -> 0, <= c2 -> 1, <= c3 -> 2, else 3
+CUTS: Dict[str, Tuple[float, float, float]] = {
+    "meeting_hours": (5, 10, 15),
+    "after_hours": (0.5, 2, 4),
+    "email_backlog": (10, 30, 60),
+}
+
 def _range_to_mid(r: str) -> float:
     r = (r or "").strip()
     if not r:
@@ -165,6 +185,93 @@ FREQ_MAP = {
     "no": 0,
 }
 
+RESPONSE_PRESSURE_MAP = {"yes": 2}
+
+COLLAB_PEOPLE_MAP = {
+    "3-5": 1, "3–5": 1,
+    "6-10": 2, "6–10": 2,
+    "10+": 3, "10＋": 3,
+}
+
+TAX_WEIGHTS: Dict[str, int] = {
+    "MEETINGS": 2,
+    "FRAGMENTATION": 2,
+    "MESSAGE_PRESSURE": 2,
+    "RESPONSE_LAG": 1,
+    "AFTER_HOURS": 1,
+    "BOTTLENECKS": 1,
+}
+
+# (max weighted score, tax %, focus hours lost); the last band has no max
+TAX_BANDS: List[Tuple[Any, str, str]] = [
+    (3, "5–8%", "1–3 hrs"),
+    (7, "12–18%", "3–6 hrs"),
+    (12, "18–26%", "6–9 hrs"),
+    (None, "26–35%", "9–12 hrs"),
+]
+
+RISK_AREAS = ["AFTER_HOURS", "MESSAGE_PRESSURE", "BOTTLENECKS"]
+
+# house -> area weights; dict order is also the tie order
+HOUSE_WEIGHTS: Dict[str, Dict[str, int]] = {
+    "CALENDAR": {"MEETINGS": 2, "FRAGMENTATION": 2},
+    "CURRENT": {"MESSAGE_PRESSURE": 2, "RESPONSE_LAG": 1, "FRAGMENTATION": 1},
+    "COUNCIL": {"BOTTLENECKS": 2, "MEETINGS": 1},
+    "GLUE": {"FRAGMENTATION": 2, "BOTTLENECKS": 1, "RESPONSE_LAG": 1},
+}
+
+# Conditions are lists of clauses; a clause maps area -> [min, max] (None =
+# unbounded) and holds when every area is in range. A condition holds when
+# any clause does; a rule without "when" always applies. First match wins.
+HOUSE_TIEBREAK: List[Dict[str, Any]] = [
+    {"house": "CALENDAR", "when": [{"MEETINGS": [2, None], "FRAGMENTATION": [2, None]}]},
+    {"house": "CURRENT", "when": [{"MESSAGE_PRESSURE": [2, None]}]},
+    {"house": "COUNCIL", "when": [{"BOTTLENECKS": [2, None]}, {"AFTER_HOURS": [2, None]}]},
+]
+
+VARIANT_RULES: Dict[str, List[Dict[str, Any]]] = {
+    "CALENDAR": [
+        {"variant": "MEETING_PINBALL", "when": [{"MEETINGS": [2, None], "FRAGMENTATION": [2, None]}]},
+        {"variant": "ASYNC_NEVER_HAPPENED"},
+    ],
+    "CURRENT": [
+        {"variant": "INBOX_TRIAGE_NURSE", "when": [{"MESSAGE_PRESSURE": [2, None], "RESPONSE_LAG": [2, None]}]},
+        {"variant": "NOTIFICATION_STORM"},
+    ],
+    "COUNCIL": [
+        {"variant": "AFTER_HOURS_CREEP", "when": [{"AFTER_HOURS": [2, None], "BOTTLENECKS": [None, 1]}]},
+        {"variant": "BOTTLENECK_MAGNET", "when": [{"BOTTLENECKS": [2, None]}]},
+        {"variant": "AFTER_HOURS_CREEP", "when": [{"AFTER_HOURS": [1, None]}]},
+        {"variant": "BOTTLENECK_MAGNET"},
+    ],
+    "GLUE": [
+        {"variant": "CONTEXT_SWITCH_TAXPAYER", "when": [{"FRAGMENTATION": [2, None]}]},
+        {"variant": "INVISIBLE_PM"},
+    ],
+}
+
+RECLAIM_BY_AREA: Dict[str, Dict[str, str]] = {
+    "MEETINGS": {"action": "Convert 1–2 recurring syncs to async updates", "impact": "~1–2 hrs/week"},
+    "FRAGMENTATION": {"action": "Protect 2×90-minute focus blocks on 3 days", "impact": "~1–2 hrs/week"},
+    "MESSAGE_PRESSURE": {"action": "Batch responses into 2 daily windows + triage rule", "impact": "~0.5–1.5 hrs/week"},
+    "AFTER_HOURS": {"action": "Set a boundary window (no meetings / no-response)", "impact": "~0.5–1.5 hrs/week"},
+    "BOTTLENECKS": {"action": "Assign a single decision owner + 48h decision window", "impact": "~0.5–2 hrs/week"},
+    "RESPONSE_LAG": {"action": "Define response SLAs + owner routing for threads", "impact": "~0.5–1.5 hrs/week"},
+}
+RECLAIM_FILLER = {"action": "Use one async update template (status/blockers/decision)", "impact": "~0.5–1.5 hrs/week"}
+
+# Option values the quiz (static/index.html) can submit; "" means unanswered.
+SURVEY_OPTIONS: Dict[str, List[str]] = {
+    "meeting_hours_range": ["", "0-5", "5-10", "10-15", "15-20", "20+"],
+    "meet_interrupts": ["", "A few times", "Most days", "Every day"],
+    "after_hours_hours_range": ["", "0-0.5", "0.5-1", "1-3", "3-5", "5+"],
+    "email_backlog_range": ["", "0-10", "10-30", "30-60", "60+"],
+    "email_behind_freq": ["", "Sometimes", "Most days", "Constantly"],
+    "response_pressure": ["", "Yes", "No"],
+    "notif_interrupt_freq": ["", "A few times a day", "Every hour", "Multiple times an hour", "Constantly"],
+    "collab_people": ["", "3-5", "6-10", "10+"],
+}
+
 def normalize_survey(s: Dict[str, Any]) -> Dict[str, Any]:
     meeting_hours_mid = _range_to_mid(s.get("meeting_hours_range", ""))
     after_hours_mid = _range_to_mid(s.get("after_hours_hours_range", ""))
@@ -173,24 +280,16 @@ def normalize_survey(s: Dict[str, Any]) -> Dict[str, Any]:
     fragmentation = FREQ_MAP.get(str(s.get("meet_interrupts", "")).lower(), 0)
     notif_press = FREQ_MAP.get(str(s.get("notif_interrupt_freq", "")).lower(), 0)
     email_behind = FREQ_MAP.get(str(s.get("email_behind_freq", "")).lower(), 0)
-    response_press = 2 if str(s.get("response_pressure", "")).lower() == "yes" else 0
-
-    collab_people = str(s.get("collab_people", "")).strip()
-    bottlenecks = 0
-    if collab_people in ("3-5", "3–5"):
-        bottlenecks = 1
-    elif collab_people in ("6-10", "6–10"):
-        bottlenecks = 2
-    elif collab_people in ("10+", "10＋"):
-        bottlenecks = 3
-
-    meetings = _scale(meeting_hours_mid, (5, 10, 15))
-    after_hours = _scale(after_hours_mid, (0.5, 2, 4))
-    message_press = max(_scale(email_backlog_mid, (10, 30, 60)), notif_press)
+    response_press = RESPONSE_PRESSURE_MAP.get(str(s.get("response_pressure", "")).lower(), 0)
+    bottlenecks = COLLAB_PEOPLE_MAP.get(str(s.get("collab_people", "")).strip(), 0)
+
+    meetings = _scale(meeting_hours_mid, CUTS["meeting_hours"])
+    after_hours = _scale(after_hours_mid, CUTS["after_hours"])
+    message_press = max(_scale(email_backlog_mid, CUTS["email_backlog"]), notif_press)
     response_lag = max(response_press, email_behind)
 
     def label4(score: int) -> str:
-        return ["low", "moderate", "high", "severe"][max(0, min(3, score))]
+        return LEVELS[max(0, min(3, score))]
 
     return {
         "ranges": {
@@ -216,39 +315,28 @@ def normalize_survey(s: Dict[str, Any]) -> Dict[str, Any]:
         },
     }
 
+def _holds(sc: Dict[str, int], when: List[Dict[str, List[Any]]]) -> bool:
+    return any(
+        all((lo is None or sc[area] >= lo) and (hi is None or sc[area] <= hi) for area, (lo, hi) in clause.items())
+        for clause in when
+    )
+
 def coordination_tax(signals: Dict[str, Any]) -> Tuple[str, str]:
     sc = signals["scores"]
-    w = (
-        sc["MEETINGS"] * 2
-        + sc["FRAGMENTATION"] * 2
-        + sc["MESSAGE_PRESSURE"] * 2
-        + sc["RESPONSE_LAG"]
-        + sc["AFTER_HOURS"]
-        + sc["BOTTLENECKS"]
-    )
-    if w <= 3:
-        return "5–8%", "1–3 hrs"
-    if w <= 7:
-        return "12–18%", "3–6 hrs"
-    if w <= 12:
-        return "18–26%", "6–9 hrs"
-    return "26–35%", "9–12 hrs"
+    w = sum(sc[area] * weight for area, weight in TAX_WEIGHTS.items())
+    for most, tax, focus in TAX_BANDS:
+        if most is None or w <= most:
+            return tax, focus
+    raise AssertionError("TAX_BANDS must end with an open band")
 
 def risk_level(signals: Dict[str, Any]) -> str:
-    r = max(
-        signals["scores"]["AFTER_HOURS"],
-        signals["scores"]["MESSAGE_PRESSURE"],
-        signals["scores"]["BOTTLENECKS"],
-    )
-    return ["Low", "Moderate", "High", "High"][r]
+    return RISK_LABELS[max(signals["scores"][a] for a in RISK_AREAS)]
 
 def house_scores(signals: Dict[str, Any]) -> Dict[str, int]:
     sc = signals["scores"]
     return {
-        "CALENDAR": 2 * sc["MEETINGS"] + 2 * sc["FRAGMENTATION"],
-        "CURRENT": 2 * sc["MESSAGE_PRESSURE"] + sc["RESPONSE_LAG"] + sc["FRAGMENTATION"],
-        "COUNCIL": 2 * sc["BOTTLENECKS"] + sc["MEETINGS"],
-        "GLUE": 2 * sc["FRAGMENTATION"] + sc["BOTTLENECKS"] + sc["RESPONSE_LAG"],
+        house: sum(sc[area] * weight for area, weight in weights.items())
+        for house, weights in HOUSE_WEIGHTS.items()
     }
 
 def pick_house(signals: Dict[str, Any]) -> str:
@@ -258,28 +346,17 @@ def pick_house(signals: Dict[str, Any]) -> str:
     if len(tied) == 1:
         return tied[0]
     sc = signals["scores"]
-    if "CALENDAR" in tied and (sc["MEETINGS"] >= 2 and sc["FRAGMENTATION"] >= 2):
-        return "CALENDAR"
-    if "CURRENT" in tied and (sc["MESSAGE_PRESSURE"] >= 2):
-        return "CURRENT"
-    if "COUNCIL" in tied and (sc["BOTTLENECKS"] >= 2 or sc["AFTER_HOURS"] >= 2):
-        return "COUNCIL"
+    for rule in HOUSE_TIEBREAK:
+        if rule["house"] in tied and _holds(sc, rule["when"]):
+            return rule["house"]
     return tied[0]
 
 def pick_variant(signals: Dict[str, Any], house: str) -> str:
     sc = signals["scores"]
-    if house == "CALENDAR":
-        return "MEETING_PINBALL" if (sc["MEETINGS"] >= 2 and sc["FRAGMENTATION"] >= 2) else "ASYNC_NEVER_HAPPENED"
-    if house == "CURRENT":
-        return "INBOX_TRIAGE_NURSE" if (sc["MESSAGE_PRESSURE"] >= 2 and sc["RESPONSE_LAG"] >= 2) else "NOTIFICATION_STORM"
-    if house == "COUNCIL":
-        if sc["AFTER_HOURS"] >= 2 and sc["BOTTLENECKS"] < 2:
-            return "AFTER_HOURS_CREEP"
-        if sc["BOTTLENECKS"] >= 2:
-            return "BOTTLENECK_MAGNET"
-        return "AFTER_HOURS_CREEP" if sc["AFTER_HOURS"] >= 1 else "BOTTLENECK_MAGNET"
-    # GLUE
-    return "CONTEXT_SWITCH_TAXPAYER" if sc["FRAGMENTATION"] >= 2 else "INVISIBLE_PM"
+    for rule in VARIANT_RULES[house]:
+        if "when" not in rule or _holds(sc, rule["when"]):
+            return rule["variant"]
+    raise AssertionError(f"VARIANT_RULES[{house!r}] must end with a default")
 
 def top_areas(signals: Dict[str, Any], n: int = 2) -> List[str]:
     ranked = sorted(signals["scores"].items(), key=lambda kv: kv[1], reverse=True)
@@ -297,24 +374,28 @@ def maria_actions_for(signals: Dict[str, Any], n: int = 3) -> List[str]:
     return out[:n]
 
 def reclaim_plan(signals: Dict[str, Any]) -> List[Dict[str, str]]:
-    plan: List[Dict[str, str]] = []
-    for a in top_areas(signals, 3):
-        if a == "MEETINGS":
-            plan.append({"action": "Convert 1–2 recurring syncs to async updates", "impact": "~1–2 hrs/week"})
-        elif a == "FRAGMENTATION":
-            plan.append({"action": "Protect 2×90-minute focus blocks on 3 days", "impact": "~1–2 hrs/week"})
-        elif a == "MESSAGE_PRESSURE":
-            plan.append({"action": "Batch responses into 2 daily windows + triage rule", "impact": "~0.5–1.5 hrs/week"})
-        elif a == "AFTER_HOURS":
-            plan.append({"action": "Set a boundary window (no meetings / no-response)", "impact": "~0.5–1.5 hrs/week"})
-        elif a == "BOTTLENECKS":
-            plan.append({"action": "Assign a single decision owner + 48h decision window", "impact": "~0.5–2 hrs/week"})
-        elif a == "RESPONSE_LAG":
-            plan.append({"action": "Define response SLAs + owner routing for threads", "impact": "~0.5–1.5 hrs/week"})
+    plan = [dict(RECLAIM_BY_AREA[a]) for a in top_areas(signals, 3) if a in RECLAIM_BY_AREA]
     while len(plan) < 3:
-        plan.append({"action": "Use one async update template (status/blockers/decision)", "impact": "~0.5–1.5 hrs/week"})
+        plan.append(dict(RECLAIM_FILLER))
     return plan[:3]
 
+# receipt field -> HOUSES / VARIANTS entry it is copied from
+HOUSE_COPY = {"house_name": "name", "house_motto": "motto", "house_strength": "strength", "house_shadow": "shadow"}
+VARIANT_COPY = {"variant_name": "name", "variant_means": "means", "fastest_win": "win"}
+
+def refresh_copy(receipt: Dict[str, Any]) -> bool:
+    """Update a stored receipt's House and variant copy from the current tables. True if anything changed."""
+    changed = False
+    for table, key, fields in ((HOUSES, "house_key", HOUSE_COPY), (VARIANTS, "variant_key", VARIANT_COPY)):
+        entry = table.get(receipt.get(key, ""))
+        if entry is None:
+            continue
+        for f, k in fields.items():
+            if receipt.get(f) != entry[k]:
+                receipt[f] = entry[k]
+                changed = True
+    return changed
+
 def build_receipt(survey: Dict[str, Any]) -> Dict[str, Any]:
     signals = normalize_survey(survey)
     tax_pct, focus_lost = coordination_tax(signals)
@@ -334,15 +415,10 @@ def build_receipt(survey: Dict[str, Any]) -> Dict[str, Any]:
         "risk": risk_level(signals),
 
         "house_key": house_key,
-        "house_name": house["name"],
-        "house_motto": house["motto"],
-        "house_strength": house["strength"],
-        "house_shadow": house["shadow"],
+        **{f: house[k] for f, k in HOUSE_COPY.items()},
 
         "variant_key": variant_key,
-        "variant_name": variant["name"],
-        "variant_means": variant["means"],
-        "fastest_win": variant["win"],
+        **{f: variant[k] for f, k in VARIANT_COPY.items()},
 
         "maria_actions": maria_actions_for(signals),
         "reclaim_plan": reclaim_plan(signals),
@@ -351,3 +427,33 @@ def build_receipt(survey: Dict[str, Any]) -> Dict[str, Any]:
         "signals": signals,
         "house_scores": house_scores(signals),
     }
+
+@lru_cache(maxsize=1)
+def rules() -> Dict[str, Any]:
+    """Every table the scoring above reads, for static/scoring.js. `version` hashes the rest."""
+    body = {
+        "areas": AREAS,
+        "levels": LEVELS,
+        "risk_labels": RISK_LABELS,
+        "risk_areas": RISK_AREAS,
+        "cuts": CUTS,
+        "freq_map": FREQ_MAP,
+        "response_pressure_map": RESPONSE_PRESSURE_MAP,
+        "collab_people_map": COLLAB_PEOPLE_MAP,
+        "tax_weights": TAX_WEIGHTS,
+        "tax_bands": TAX_BANDS,
+        "house_weights": HOUSE_WEIGHTS,
+        "house_tiebreak": HOUSE_TIEBREAK,
+        "variant_rules": VARIANT_RULES,
+        "houses": HOUSES,
+        "variants": VARIANTS,
+        "actions_by_area": ACTIONS_BY_AREA,
+        "reclaim_by_area": RECLAIM_BY_AREA,
+        "reclaim_filler": RECLAIM_FILLER,
+        "cheat_sheet": CHEAT_SHEET,
+        "survey_options": SURVEY_OPTIONS,
+    }
+    # round-trip so tuples become lists, exactly as clients will see them
+    body = json.loads(json.dumps(body, ensure_ascii=False))
+    digest = hashlib.sha256(json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return {"version": digest.hexdigest()[:12], **body}
@@ -1,9 +1,16 @@
 from __future__ import annotations
 from typing import Dict, Any, Tuple
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from functools import lru_cache
+import io
 import os
+import time
 import math
 import random
+from xml.sax.saxutils import escape
+
+import glyphs
+import tracing
 
 RECEIPT_W, RECEIPT_H = 1080, 1350
 BADGE_W, BADGE_H = 1080, 1080
@@ -28,6 +35,14 @@ HAIRLINE = (230, 233, 240)  # thin borders
 PAPER = (252, 252, 253)     # warm white
 PAPER_2 = (246, 248, 252)   # cool off-white
 
+# Cross-process cache of plates and finished badges (see sharedcache.py);
+# set by sharedcache.attach(). Without it everything is built per process.
+_SHARED = None
+# PNG text goes through cached glyph masks (see glyphs.py); GLYPH_ATLAS=0 uses
+# plain ImageDraw.text.
+_ATLAS = os.getenv("GLYPH_ATLAS", "1") not in ("0", "false", "False", "off")
+
+@lru_cache(maxsize=None)
 def _font(size: int, bold: bool=False):
     if bold:
         candidates = [
@@ -62,6 +77,7 @@ def _wrap(draw, text, font, max_width):
 def _rounded_rect(draw, xy, r, fill=None, outline=None, width=1):
     draw.rounded_rectangle(list(xy), radius=r, fill=fill, outline=outline, width=width)
 
+@tracing.traced("render._linear_gradient")
 def _linear_gradient(size: Tuple[int,int], c1: Tuple[int,int,int], c2: Tuple[int,int,int]) -> Image.Image:
     w, h = size
     img = Image.new("RGB", (w, h), c1)
@@ -74,6 +90,7 @@ def _linear_gradient(size: Tuple[int,int], c1: Tuple[int,int,int], c2: Tuple[int
         d.line((0, y, w, y), fill=(r,g,b))
     return img
 
+@tracing.traced("render._add_soft_noise")
 def _add_soft_noise(img: Image.Image, amount: int = 10) -> Image.Image:
     # Gentle texture so it doesn't look like a flat template.
     w, h = img.size
@@ -88,24 +105,35 @@ def _add_soft_noise(img: Image.Image, amount: int = 10) -> Image.Image:
     out.alpha_composite(Image.merge("RGBA", (noise, noise, noise, Image.new("L",(w,h),18))))
     return out.convert("RGB")
 
+ORBIT_RADII = (160, 240, 330)
+ORBIT_ARC = (210, 340)
+
+def _orbit_geometry(size: Tuple[int,int]):
+    # Shared by the PNG and SVG backends: orbit centre + dot centres.
+    w, h = size
+    cx, cy = int(w*0.72), int(h*0.20)
+    rng = random.Random(21)
+    dots = []
+    for _ in range(24):
+        r = rng.choice(list(ORBIT_RADII))
+        ang = rng.uniform(*ORBIT_ARC) * math.pi / 180
+        dots.append((int(cx + math.cos(ang)*r), int(cy + math.sin(ang)*r)))
+    return (cx, cy), dots
+
 def _orbit_dots_layer(size: Tuple[int,int], accent: Tuple[int,int,int]) -> Image.Image:
     # Minimal "work engine/orbit" motif: faint arcs + dots
     w, h = size
     layer = Image.new("RGBA", (w, h), (0,0,0,0))
     d = ImageDraw.Draw(layer)
-    cx, cy = int(w*0.72), int(h*0.20)
-    for r in (160, 240, 330):
+    (cx, cy), dots = _orbit_geometry(size)
+    for r in ORBIT_RADII:
         bbox = (cx-r, cy-r, cx+r, cy+r)
-        d.arc(bbox, start=210, end=340, fill=(*accent, 60), width=3)
-    rng = random.Random(21)
-    for _ in range(24):
-        r = rng.choice([160, 240, 330])
-        ang = rng.uniform(210, 340) * math.pi / 180
-        x = int(cx + math.cos(ang)*r)
-        y = int(cy + math.sin(ang)*r)
+        d.arc(bbox, start=ORBIT_ARC[0], end=ORBIT_ARC[1], fill=(*accent, 60), width=3)
+    for x, y in dots:
         d.ellipse((x-6, y-6, x+6, y+6), fill=(*accent, 85))
     return layer
 
+@tracing.traced("render._shadowed_card")
 def _shadowed_card(base: Image.Image, rect, radius=34, shadow_alpha=70):
     w, h = base.size
     x0, y0, x1, y1 = rect
@@ -117,20 +145,145 @@ def _shadowed_card(base: Image.Image, rect, radius=34, shadow_alpha=70):
     out.alpha_composite(shadow)
     return out.convert("RGB")
 
+# ---------------------------------------------------------
+# SVG backend
+# ---------------------------------------------------------
+_MEASURE = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+SVG_FONT_FAMILY = "'DejaVu Sans', Verdana, Geneva, sans-serif"
+
+def _hex(c) -> str:
+    # The PNG canvas is RGB, so Pillow drops any alpha in draw colors; do the same.
+    return "#%02x%02x%02x" % tuple(c[:3])
+
+class SvgCanvas:
+    """Records the ImageDraw calls the layouts make and emits SVG.
+
+    Text is measured with the same FreeType fonts as the PNG path, so wraps and
+    positions match; only the plate texture (noise) is left out.
+    """
+
+    def __init__(self, w: int, h: int):
+        self.w, self.h = w, h
+        self.defs: list = []
+        self.parts: list = []
+        self.fonts: Dict[Tuple[int, bool], str] = {}
+
+    def textlength(self, text, font=None):
+        return _MEASURE.textlength(text, font=font)
+
+    def _font_class(self, font) -> str:
+        size = getattr(font, "size", 11)
+        bold = "Bold" in getattr(font, "path", "")
+        return self.fonts.setdefault((size, bold), f"f{size}{'b' if bold else ''}")
+
+    def text(self, xy, text, font=None, fill=INK):
+        x, y = xy
+        ascent = font.getmetrics()[0] if hasattr(font, "getmetrics") else 0
+        self.parts.append(
+            f'<text x="{x:g}" y="{y + ascent:g}" class="{self._font_class(font)}" '
+            f'fill="{_hex(fill)}">{escape(text)}</text>'
+        )
+
+    def line(self, xy, fill=None, width=1):
+        x0, y0, x1, y1 = xy
+        self.parts.append(f'<line x1="{x0}" y1="{y0}" x2="{x1}" y2="{y1}" stroke="{_hex(fill)}" stroke-width="{width}"/>')
+
+    def _box(self, xy, width, outline):
+        # Pillow boxes are inclusive and strokes sit inside the shape.
+        x0, y0, x1, y1 = xy
+        inset = width / 2 if outline is not None else 0
+        return x0 + inset, y0 + inset, x1 + 1 - x0 - 2*inset, y1 + 1 - y0 - 2*inset, inset
+
+    def _paint(self, fill, outline, width) -> str:
+        out = f'fill="{_hex(fill)}"' if fill is not None else 'fill="none"'
+        if outline is not None:
+            out += f' stroke="{_hex(outline)}" stroke-width="{width}"'
+        return out
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        x, y, w, h, inset = self._box(xy, width, outline)
+        r = max(0, radius - inset)
+        self.parts.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" rx="{r:g}" {self._paint(fill, outline, width)}/>')
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        x, y, w, h, _ = self._box(xy, width, outline)
+        self.parts.append(
+            f'<ellipse cx="{x + w/2:g}" cy="{y + h/2:g}" rx="{w/2:g}" ry="{h/2:g}" {self._paint(fill, outline, width)}/>'
+        )
+
+    def plate(self, card, radius: int, shadow_alpha: int, motif=None):
+        """Gradient background, optional orbit motif, soft shadow and white card."""
+        self.defs.append(
+            f'<linearGradient id="bg" x1="0" y1="0" x2="0" y2="1">'
+            f'<stop offset="0" stop-color="{_hex(PAPER)}"/><stop offset="1" stop-color="{_hex(PAPER_2)}"/></linearGradient>'
+            '<filter id="shadow" x="-10%" y="-10%" width="120%" height="120%"><feGaussianBlur stdDeviation="14"/></filter>'
+        )
+        self.parts.append(f'<rect width="{self.w}" height="{self.h}" fill="url(#bg)"/>')
+        if motif is not None:
+            (cx, cy), dots = _orbit_geometry((self.w, self.h))
+            a0, a1 = (a * math.pi / 180 for a in ORBIT_ARC)
+            for r in ORBIT_RADII:
+                self.parts.append(
+                    f'<path d="M{cx + math.cos(a0)*r:.1f} {cy + math.sin(a0)*r:.1f} '
+                    f'A{r} {r} 0 0 1 {cx + math.cos(a1)*r:.1f} {cy + math.sin(a1)*r:.1f}" '
+                    f'fill="none" stroke="{_hex(motif)}" stroke-opacity="{60/255:.3f}" stroke-width="3"/>'
+                )
+            self.parts.append(
+                f'<g fill="{_hex(motif)}" fill-opacity="{85/255:.3f}">'
+                + "".join(f'<circle cx="{x}" cy="{y}" r="6"/>' for x, y in dots)
+                + "</g>"
+            )
+        x0, y0, x1, y1 = card
+        self.parts.append(
+            f'<rect x="{x0}" y="{y0 + 10}" width="{x1 - x0}" height="{y1 - y0}" rx="{radius}" '
+            f'fill-opacity="{shadow_alpha/255:.3f}" filter="url(#shadow)"/>'
+        )
+        self.rounded_rectangle(card, radius=radius, fill=(255,255,255), outline=HAIRLINE, width=3)
+
+    def glow(self, bbox, accent, alpha: int, blur: int):
+        self.defs.append(f'<filter id="glow" x="-50%" y="-50%" width="200%" height="200%"><feGaussianBlur stdDeviation="{blur}"/></filter>')
+        x0, y0, x1, y1 = bbox
+        self.parts.append(
+            f'<ellipse cx="{(x0 + x1)/2:g}" cy="{(y0 + y1)/2:g}" rx="{(x1 - x0)/2:g}" ry="{(y1 - y0)/2:g}" '
+            f'fill="{_hex(accent)}" fill-opacity="{alpha/255:.3f}" filter="url(#glow)"/>'
+        )
+
+    def tostring(self) -> str:
+        css = "".join(
+            f".{cls}{{font:{700 if bold else 400} {size}px {SVG_FONT_FAMILY}}}"
+            for (size, bold), cls in self.fonts.items()
+        )
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.w}" height="{self.h}" viewBox="0 0 {self.w} {self.h}">'
+            f'<defs>{"".join(self.defs)}<style>{css}</style></defs>'
+            + "".join(self.parts)
+            + "</svg>"
+        )
+
 # ---------------------------------------------------------
 # Receipt (clean, minimal)
 # ---------------------------------------------------------
-def render_receipt_png(receipt: Dict[str, Any], out_path: str):
+RECEIPT_CARD = (60, 56, RECEIPT_W - 60, RECEIPT_H - 56)
+
+@lru_cache(maxsize=None)
+def _receipt_plate() -> Image.Image:
+    # Background + card never depend on the receipt: mapped from the shared
+    # cache when there is one (RGBX there), else built once per process.
+    # Callers draw on a .convert("RGB") copy.
+    img = _SHARED.image("plate:receipt") if _SHARED is not None else None
+    return img if img is not None else _build_receipt_plate()
+
+def _build_receipt_plate() -> Image.Image:
     img = _linear_gradient((RECEIPT_W, RECEIPT_H), PAPER, PAPER_2)
     img = _add_soft_noise(img, amount=8)
+    img = _shadowed_card(img, RECEIPT_CARD, radius=34, shadow_alpha=60)
     d = ImageDraw.Draw(img)
+    _rounded_rect(d, RECEIPT_CARD, r=34, fill=(255,255,255), outline=HAIRLINE, width=3)
+    return img
 
-    mx, my = 60, 56
-    card = (mx, my, RECEIPT_W - mx, RECEIPT_H - my)
-    img = _shadowed_card(img, card, radius=34, shadow_alpha=60)
-    d = ImageDraw.Draw(img)
-    _rounded_rect(d, card, r=34, fill=(255,255,255), outline=HAIRLINE, width=3)
-
+def _receipt_layout(d, receipt: Dict[str, Any]):
+    # `d` is an ImageDraw.Draw or an SvgCanvas; both backends share this layout.
+    card = RECEIPT_CARD
     x0, y0, x1, y1 = card
     pad = 46
     lx, rx = x0 + pad, x1 - pad
@@ -239,17 +392,56 @@ def render_receipt_png(receipt: Dict[str, Any], out_path: str):
         footer_y += 20
     d.text((lx, footer_y + 24), "Chambiar • Get notified at launch", font=small, fill=MUTED)
 
+class _TimedDraw:
+    """ImageDraw proxy that totals time spent in text() on the current span."""
+
+    def __init__(self, draw, span):
+        self._draw = draw
+        self._span = span
+
+    def __getattr__(self, name):
+        return getattr(self._draw, name)
+
+    def text(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self._draw.text(*args, **kwargs)
+        finally:
+            self._span.add("text.calls", 1)
+            self._span.add("text.ms", round((time.perf_counter() - t0) * 1000, 3))
+
+def _draw(img: Image.Image):
+    d = glyphs.AtlasDraw(img) if _ATLAS else ImageDraw.Draw(img)
+    span = tracing.current()
+    return d if span is None else _TimedDraw(d, span)
+
+def render_receipt_png(receipt: Dict[str, Any], out_path: str):
+    img = _receipt_plate().convert("RGB")
+    _receipt_layout(_draw(img), receipt)
     img.save(out_path, format="PNG")
 
+def render_receipt_svg(receipt: Dict[str, Any]) -> str:
+    c = SvgCanvas(RECEIPT_W, RECEIPT_H)
+    c.plate(RECEIPT_CARD, radius=34, shadow_alpha=60)
+    _receipt_layout(c, receipt)
+    return c.tostring()
+
 # ---------------------------------------------------------
 # Badge (aesthetic, "Chambiar.ai"-style)
 # ---------------------------------------------------------
-def render_badge_png(receipt: Dict[str, Any], out_path: str):
-    house_key = receipt.get("house_key", "CURRENT")
-    style = HOUSE_STYLE.get(house_key, HOUSE_STYLE["CURRENT"])
-    accent = style["accent"]
-    emoji = style["emoji"]
+BADGE_CARD = (68, 84, BADGE_W - 68, BADGE_H - 84)
+BADGE_PAD = 52
 
+@lru_cache(maxsize=None)
+def _badge_plate(accent: Tuple[int,int,int]) -> Image.Image:
+    # Everything behind the text depends only on the House accent.
+    img = _SHARED.image(badge_plate_key(accent)) if _SHARED is not None else None
+    return img if img is not None else _build_badge_plate(accent)
+
+def badge_plate_key(accent: Tuple[int,int,int]) -> str:
+    return "plate:badge:" + _hex(accent)
+
+def _build_badge_plate(accent: Tuple[int,int,int]) -> Image.Image:
     # Background: warm-white → cool-white gradient + tiny texture + orbit motif
     bg = _linear_gradient((BADGE_W, BADGE_H), PAPER, PAPER_2)
     bg = _add_soft_noise(bg, amount=7)
@@ -260,16 +452,13 @@ def render_badge_png(receipt: Dict[str, Any], out_path: str):
     img = bg_rgba.convert("RGB")
 
     # Card: "invisible" glass — white with thin border + soft shadow
-    mx, my = 68, 84
-    card = (mx, my, BADGE_W - mx, BADGE_H - my)
+    card = BADGE_CARD
     img = _shadowed_card(img, card, radius=36, shadow_alpha=55)
     d = ImageDraw.Draw(img)
     _rounded_rect(d, card, r=36, fill=(255, 255, 255), outline=HAIRLINE, width=3)
 
     x0, y0, x1, y1 = card
-    pad = 52
-    lx, rx = x0 + pad, x1 - pad
-    y = y0 + pad
+    rx = x1 - BADGE_PAD
 
     # Subtle accent corner glow
     glow = Image.new("RGBA", img.size, (0,0,0,0))
@@ -278,8 +467,31 @@ def render_badge_png(receipt: Dict[str, Any], out_path: str):
     glow = glow.filter(ImageFilter.GaussianBlur(40))
     img_rgba = img.convert("RGBA")
     img_rgba.alpha_composite(glow)
-    img = img_rgba.convert("RGB")
-    d = ImageDraw.Draw(img)
+    return img_rgba.convert("RGB")
+
+# The only receipt fields a badge shows, so there are as many distinct badges
+# as variants.
+BADGE_FIELDS = (
+    "house_key", "house_name", "house_motto", "house_strength",
+    "variant_name", "variant_means", "fastest_win",
+)
+
+def badge_key(receipt: Dict[str, Any], ext: str) -> str:
+    return f"badge:{ext}:" + "\x1f".join(str(receipt.get(f, "")) for f in BADGE_FIELDS)
+
+def _badge_style(receipt: Dict[str, Any]) -> Dict[str, Any]:
+    return HOUSE_STYLE.get(receipt.get("house_key", "CURRENT"), HOUSE_STYLE["CURRENT"])
+
+def _badge_layout(d, receipt: Dict[str, Any]):
+    style = _badge_style(receipt)
+    accent = style["accent"]
+    emoji = style["emoji"]
+
+    card = BADGE_CARD
+    x0, y0, x1, y1 = card
+    pad = BADGE_PAD
+    lx, rx = x0 + pad, x1 - pad
+    y = y0 + pad
 
     # Top line: "Work Week House" + thin accent rule
     label_f = _font(18, bold=True)
@@ -368,4 +580,51 @@ def render_badge_png(receipt: Dict[str, Any], out_path: str):
     d.text((lx, footer_y), "Share-safe • no titles/subjects/names", font=small, fill=MUTED)
     d.text((lx, footer_y + 26), "Chambiar • Get notified at launch", font=small, fill=MUTED)
 
-    img.save(out_path, format="PNG")
\ No newline at end of file
+def render_badge_png(receipt: Dict[str, Any], out_path: str):
+    img = _badge_plate(_badge_style(receipt)["accent"]).convert("RGB")
+    _badge_layout(_draw(img), receipt)
+    img.save(out_path, format="PNG")
+
+def render_badge_svg(receipt: Dict[str, Any]) -> str:
+    accent = _badge_style(receipt)["accent"]
+    c = SvgCanvas(BADGE_W, BADGE_H)
+    c.plate(BADGE_CARD, radius=36, shadow_alpha=55, motif=accent)
+    x0, y0, x1, y1 = BADGE_CARD
+    rx = x1 - BADGE_PAD
+    c.glow((rx-420, y0-60, rx+220, y0+580), accent, alpha=55, blur=40)
+    _badge_layout(c, receipt)
+    return c.tostring()
+
+def render_blob(kind: str, ext: str, receipt: Dict[str, Any]) -> bytes:
+    """Bytes for the store blob `<kind>/<rid>.<ext>` (kind: images|badges, ext: png|svg)."""
+    badge = kind == "badges"
+    with tracing.span("render", kind=kind, ext=ext) as span:
+        if badge and _SHARED is not None:
+            data = _SHARED.blob(badge_key(receipt, ext))
+            if data is not None:
+                span.set("cache", "hit")
+                return data
+        if ext == "svg":
+            return (render_badge_svg if badge else render_receipt_svg)(receipt).encode("utf-8")
+        buf = io.BytesIO()
+        (render_badge_png if badge else render_receipt_png)(receipt, buf)
+        return buf.getvalue()
+
+# ---------------------------------------------------------
+# Warm-up
+# ---------------------------------------------------------
+FONT_SIZES = {
+    False: (16, 18, 22, 24),
+    True: (16, 18, 22, 26, 30, 36, 54, 62),
+}
+
+def warm_up():
+    """Load every font, fill its glyph atlas and build every background plate the renderers use."""
+    for bold, sizes in FONT_SIZES.items():
+        for size in sizes:
+            a = glyphs.atlas(_font(size, bold=bold))
+            if _ATLAS and a is not None:
+                a.preload()
+    _receipt_plate()
+    for style in HOUSE_STYLE.values():
+        _badge_plate(style["accent"])
@@ -0,0 +1,160 @@
+"""Re-render every stored receipt's images after a style, copy or layout change.
+
+    python rerender.py                 # all receipts, one worker per CPU
+    python rerender.py --workers 4
+    python rerender.py --restart       # ignore the checkpoint and start over
+
+Receipts are fanned out across a process pool; each worker warms the
+renderer once. A receipt's House and variant copy is refreshed from
+receipt_engine first (the receipt JSON is saved back if it changed), then
+its images are written through the configured BlobStore, which replaces
+blobs atomically (temp file + rename locally), so live traffic never sees a
+half-written image. With STORAGE_BACKEND=s3 blobs go straight to the bucket
+and this node's cached copies are dropped; other nodes revalidate theirs
+within CACHE_TTL. Finished ids are appended to a checkpoint file
+(DATA_DIR/.rerender.checkpoint), and an interrupted run picks up where it
+stopped. The receipt PNG is only re-rendered where one exists; elsewhere
+the app still renders it lazily. With EXPORT_DIR set, exported copies are
+refreshed too. A receipt that fails to render is reported and left out of
+the checkpoint; the run carries on and exits non-zero at the end.
+"""
+from __future__ import annotations
+import argparse
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Iterable, List, Set
+
+import codec
+import export
+import layout
+import receipt_engine
+import sharedcache
+import storage
+
+# (kind, ext) re-rendered for every receipt; the receipt PNG only if present
+ALWAYS = (("images", "svg"), ("badges", "svg"), ("badges", "png"))
+LAZY = (("images", "png"),)
+
+def _init_worker():
+    import renderer
+
+    # Ctrl-C is handled by the parent, which stops handing out work
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sharedcache.attach()
+    renderer.warm_up()
+
+def rerender_one(rid: str) -> int:
+    """Re-render one receipt's images. Returns how many were written."""
+    import renderer
+
+    store = storage.get_store()
+    raw = store.read(f"receipts/{rid}.json")
+    if raw is None:
+        return 0
+    receipt = codec.loads(raw)
+    receipt.setdefault("receipt_id", rid)
+    # past a node-local read cache (STORAGE_BACKEND=s3), dropping its copy
+    write = getattr(store, "replace", store.write)
+    # the stored JSON carries the copy from when it was built; the share page
+    # reads it too, so the refreshed receipt is written back
+    if receipt_engine.refresh_copy(receipt):
+        write(f"receipts/{rid}.json", codec.dumps(receipt))
+    n = 0
+    for kind, ext in ALWAYS + LAZY:
+        key = f"{kind}/{rid}.{ext}"
+        if (kind, ext) in LAZY and not store.contains(key):
+            continue
+        write(key, renderer.render_blob(kind, ext, receipt))
+        n += 1
+    exporter = export.from_env()
+    if exporter is not None and exporter.page_path(rid).exists():
+        exporter.export_receipt(store, rid)
+    return n
+
+def load_checkpoint(path: Path) -> Set[str]:
+    try:
+        return set(path.read_text(encoding="utf-8").split())
+    except FileNotFoundError:
+        return set()
+
+def run(rids: Iterable[str], checkpoint: Path, workers: int) -> tuple:
+    """Render `rids` on `workers` processes, appending each finished id to `checkpoint`.
+
+    A receipt that fails is reported and skipped (not checkpointed, so the
+    next run retries it); the rest carry on.
+    """
+    t0 = time.perf_counter()
+    done = images = 0
+    failed: List[str] = []
+    with open(checkpoint, "a", encoding="utf-8") as ckpt, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = {}
+        todo = iter(rids)
+        while True:
+            # keep a bounded number in flight so the checkpoint trails closely
+            for rid in todo:
+                pending[pool.submit(rerender_one, rid)] = rid
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rid = pending.pop(fut)
+                try:
+                    images += fut.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    failed.append(rid)
+                    print(f"\n{rid}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                done += 1
+                ckpt.write(rid + "\n")
+            ckpt.flush()
+            elapsed = time.perf_counter() - t0
+            print(f"\r{done} receipts, {images} images, {len(failed)} failed, "
+                  f"{images / elapsed:.1f} images/s", end="", flush=True)
+    elapsed = time.perf_counter() - t0
+    print()
+    return done, images, elapsed, failed
+
+def main():
+    ap = argparse.ArgumentParser(description="Re-render stored receipt images")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--checkpoint", type=Path, default=None, help="defaults to DATA_DIR/.rerender.checkpoint")
+    ap.add_argument("--restart", action="store_true", help="discard the checkpoint and re-render everything")
+    args = ap.parse_args()
+
+    checkpoint = args.checkpoint or layout.data_dir() / ".rerender.checkpoint"
+    if args.restart and checkpoint.exists():
+        checkpoint.unlink()
+    seen = load_checkpoint(checkpoint)
+
+    store = storage.get_store()
+    rids = sorted(storage.split_key(k)[1] for k, _ in store.scan("receipts/"))
+    todo = [rid for rid in rids if rid not in seen]
+    print(f"{len(rids)} receipts, {len(rids) - len(todo)} already done, {len(todo)} to render on {args.workers} workers")
+
+    try:
+        done, images, elapsed, failed = run(todo, checkpoint, args.workers)
+    except KeyboardInterrupt:
+        print(f"\ninterrupted; {len(load_checkpoint(checkpoint) - seen)} more done, run again to resume")
+        raise SystemExit(130)
+    print(f"re-rendered {done} receipts ({images} images) in {elapsed:.1f}s, "
+          f"{images / elapsed if elapsed else 0:.1f} images/s")
+    if failed:
+        print(f"{len(failed)} receipts failed: {' '.join(failed)}; run again to retry them", file=sys.stderr)
+        raise SystemExit(1)
+    checkpoint.unlink(missing_ok=True)
+    compact = getattr(store, "compact", None)
+    if compact is not None:
+        print(f"compacted packs, reclaimed {compact()} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Retention: expire receipts and images older than N days.
+
+Receipts linked to a subscriber are kept forever: either listed in the local
+``subscribers.jsonl`` or marked with a ``keep/<rid>`` blob in the store (so
+the rule holds across nodes sharing one bucket). With STORAGE_BACKEND=s3 the
+sweep also drops this node's cached copies of blobs that are gone remotely.
+Configure with RETENTION_DAYS (unset/0 disables) and RETENTION_SWEEP_SECONDS.
+
+    python retention.py --days 30 [--dry-run]
+"""
+from __future__ import annotations
+import argparse
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set
+
+import layout
+import storage
+
+log = logging.getLogger("chambiar")
+
+def retention_days() -> float:
+    try:
+        return float(os.getenv("RETENTION_DAYS", "0") or 0)
+    except ValueError:
+        return 0.0
+
+def protected_ids(subscribers: Path, store: storage.BlobStore) -> Set[str]:
+    ids: Set[str] = {storage.split_key(key)[1] for key, _ in store.scan("keep/")}
+    if not subscribers.exists():
+        return ids
+    with subscribers.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                rid = json.loads(line).get("receipt_id")
+            except ValueError:
+                continue
+            if rid:
+                ids.add(str(rid))
+    return ids
+
+def sweep(data: Path, store: storage.BlobStore, max_age_days: float, now: Optional[float] = None, dry_run: bool = False) -> int:
+    """Delete expired receipt/image blobs. Returns the number removed."""
+    cutoff = (now or time.time()) - max_age_days * 86400
+    keep = protected_ids(data / "subscribers.jsonl", store)
+    evict_missing = getattr(store, "evict_missing", None)
+    removed = 0
+    for ns in storage.NAMESPACES:
+        live = set()
+        for key, mtime in list(store.scan(ns + "/")):
+            if mtime >= cutoff or storage.split_key(key)[1] in keep:
+                live.add(key)
+                continue
+            if not dry_run:
+                store.remove(key)
+            removed += 1
+        if evict_missing is not None and not dry_run:
+            # cached copies of blobs another node has already expired
+            evict_missing(ns + "/", live)
+    return removed
+
+class Sweeper(threading.Thread):
+    """Background thread that sweeps every `interval` seconds.
+
+    With several workers on one box only the one holding the lock file sweeps;
+    the others skip that round.
+    """
+
+    def __init__(self, data: Path, store: storage.BlobStore, max_age_days: float, interval: float):
+        super().__init__(name="retention-sweeper", daemon=True)
+        self.data, self.store = data, store
+        self.max_age_days, self.interval = max_age_days, interval
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            try:
+                self.sweep_once()
+            except Exception:
+                log.exception("retention sweep failed")
+
+    def sweep_once(self) -> int:
+        with (self.data / ".retention.lock").open("w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            removed = sweep(self.data, self.store, self.max_age_days)
+            compact = getattr(self.store, "compact", None)
+            if removed and compact is not None:
+                compact()
+            trim = getattr(self.store, "trim", None)
+            if trim is not None:
+                trim()
+        if removed:
+            log.info("retention: removed %d expired blobs", removed)
+        return removed
+
+    def stop(self):
+        self._halt.set()
+
+def start_sweeper(data: Path, store: storage.BlobStore) -> Optional[Sweeper]:
+    days = retention_days()
+    if days <= 0:
+        return None
+    s = Sweeper(data, store, days, float(os.getenv("RETENTION_SWEEP_SECONDS", "3600")))
+    s.start()
+    return s
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--days", type=float, default=None, help="defaults to $RETENTION_DAYS")
+    ap.add_argument("--data-dir", type=Path, default=None, help="defaults to $DATA_DIR or ./data")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    days = args.days if args.days is not None else retention_days()
+    if days <= 0:
+        raise SystemExit("retention disabled: pass --days or set RETENTION_DAYS")
+    data = args.data_dir or layout.data_dir()
+    n = sweep(data, storage.from_env(data), days, dry_run=args.dry_run)
+    print(f"{'would remove' if args.dry_run else 'removed'} {n} blobs older than {days:g} days")
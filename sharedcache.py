@@ -0,0 +1,200 @@
+"""Render cache shared by every worker process through one mmap'd file.
+
+Holds what never depends on an individual receipt: the receipt background
+plate, the badge plate for each House accent, and the finished PNG and SVG
+for each of the badges (one per variant). The first worker to start builds
+the file under a lock; every other worker, and every restart, just maps it
+read-only, so plates cost one copy in the page cache however many workers
+run, and a new worker is hot as soon as it has mapped the file. Plates are
+stored as RGBX: Pillow only maps 4-byte pixels in place (RGB would be
+copied into every worker's heap).
+
+The file name carries a fingerprint of renderer.py, glyphs.py, the scoring
+rules, the fonts and Pillow, so a style or copy change builds a fresh cache
+and the old one is removed.
+
+RENDER_CACHE=0 turns it off; RENDER_CACHE_DIR moves it (default
+DATA_DIR/render-cache).
+
+    python sharedcache.py build    # e.g. as a deploy step before starting workers
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image
+import PIL
+
+import layout
+
+log = logging.getLogger("chambiar")
+
+_MAGIC = b"CHRCACHE"
+_HEAD = struct.Struct("<8sI")  # magic, index length
+_ALIGN = 64
+PLATE_MODE = "RGBX"
+
+def cache_dir() -> Path:
+    return Path(os.getenv("RENDER_CACHE_DIR", "") or layout.data_dir() / "render-cache")
+
+def enabled() -> bool:
+    return os.getenv("RENDER_CACHE", "1") not in ("0", "false", "False", "off")
+
+def fingerprint() -> str:
+    import glyphs
+    import renderer
+    import receipt_engine
+
+    h = hashlib.sha256()
+    h.update(Path(__file__).read_bytes())  # file format
+    h.update(Path(renderer.__file__).read_bytes())
+    h.update(Path(glyphs.__file__).read_bytes())
+    h.update(receipt_engine.rules()["version"].encode())
+    h.update(PIL.__version__.encode())
+    for bold in (False, True):
+        h.update(str(getattr(renderer._font(16, bold=bold), "path", "default")).encode())
+    return h.hexdigest()[:16]
+
+def _canonical_badges():
+    """Badge fields for every variant, as build_receipt would fill them in."""
+    from receipt_engine import HOUSES, VARIANTS
+
+    for v in VARIANTS.values():
+        house = HOUSES[v["house"]]
+        yield {
+            "house_key": v["house"],
+            "house_name": house["name"],
+            "house_motto": house["motto"],
+            "house_strength": house["strength"],
+            "variant_name": v["name"],
+            "variant_means": v["means"],
+            "fastest_win": v["win"],
+        }
+
+def build(path: Path):
+    """Render everything the cache holds and write it to `path` atomically."""
+    import renderer
+
+    # render from scratch even if this process already maps an older cache
+    renderer._SHARED = None
+    renderer._receipt_plate.cache_clear()
+    renderer._badge_plate.cache_clear()
+    entries: Dict[str, dict] = {}
+    blobs = []
+    pos = 0
+
+    def add(name: str, data: bytes, **meta):
+        nonlocal pos
+        entries[name] = {"off": pos, "len": len(data), **meta}
+        pad = -len(data) % _ALIGN
+        blobs.append(data + b"\0" * pad)
+        pos += len(data) + pad
+
+    def add_plate(name: str, plate: Image.Image):
+        # 4 bytes per pixel: Pillow can only map RGBX in place, RGB gets copied
+        plate = plate.convert(PLATE_MODE)
+        add(name, plate.tobytes(), mode=plate.mode, size=plate.size)
+
+    add_plate("plate:receipt", renderer._build_receipt_plate())
+    for style in renderer.HOUSE_STYLE.values():
+        add_plate(renderer.badge_plate_key(style["accent"]), renderer._build_badge_plate(style["accent"]))
+    for fields in _canonical_badges():
+        for ext in ("png", "svg"):
+            add(renderer.badge_key(fields, ext), renderer.render_blob("badges", ext, fields))
+
+    # offsets are relative to the first aligned byte after the index
+    index = json.dumps({"fingerprint": path.stem, "entries": entries}).encode("utf-8")
+    head = _HEAD.pack(_MAGIC, len(index)) + index
+    head += b"\0" * (-len(head) % _ALIGN)
+
+    layout.write_atomic(path, head, *blobs)
+
+class SharedCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = _HEAD.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a render cache")
+        self.entries: Dict[str, dict] = json.loads(self._mm[_HEAD.size:_HEAD.size + n])["entries"]
+        self._base = _HEAD.size + n + (-(_HEAD.size + n) % _ALIGN)
+        self._images: Dict[str, Image.Image] = {}
+
+    def _view(self, e: dict) -> memoryview:
+        start = self._base + e["off"]
+        return memoryview(self._mm)[start:start + e["len"]]
+
+    def image(self, name: str) -> Optional[Image.Image]:
+        """Read-only image over the mapped pixels; callers draw on a converted copy."""
+        img = self._images.get(name)
+        if img is None:
+            e = self.entries.get(name)
+            if e is None:
+                return None
+            img = self._images[name] = Image.frombuffer(e["mode"], tuple(e["size"]), self._view(e), "raw", e["mode"], 0, 1)
+        return img
+
+    def blob(self, name: str) -> Optional[bytes]:
+        e = self.entries.get(name)
+        if e is None:
+            return None
+        start = self._base + e["off"]
+        return self._mm[start:start + e["len"]]
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+def ensure(directory: Optional[Path] = None) -> Path:
+    """Path of the current cache file, building it if no process has yet."""
+    directory = directory or cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"render-{fingerprint()}.bin"
+    if path.exists():
+        return path
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not path.exists():
+                build(path)
+                for old in directory.glob("render-*.bin"):
+                    if old != path:
+                        old.unlink(missing_ok=True)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return path
+
+def attach(directory: Optional[Path] = None) -> Optional[SharedCache]:
+    """Map the shared cache (building it if needed) and point the renderer at it."""
+    if not enabled():
+        return None
+    import renderer
+
+    try:
+        cache = SharedCache(ensure(directory))
+    except (OSError, ValueError):
+        log.warning("render cache unavailable; building plates per process", exc_info=True)
+        return None
+    renderer._SHARED = cache
+    renderer._receipt_plate.cache_clear()
+    renderer._badge_plate.cache_clear()
+    return cache
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Shared render cache")
+    ap.add_argument("command", choices=["build"])
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    cache = SharedCache(ensure())
+    print(f"{cache.path} ({cache.size / 1e6:.1f} MB, {len(cache.entries)} entries) in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,136 @@
+"""HTML for the share page of one receipt (/r/{rid}).
+
+Shared by the live route in app.py and the static export in export.py, which
+differ only in how links are rooted: the app uses absolute paths, the export
+relative ones (``../../``) so the tree can be served from any prefix.
+"""
+from __future__ import annotations
+import json
+
+def top_areas(receipt: dict) -> list:
+    return sorted(receipt["signals"]["scores"].items(), key=lambda kv: kv[1], reverse=True)[:2]
+
+def render(receipt: dict, page_url: str, badge_url: str, root: str = "/", api_root: str = "/") -> str:
+    """`root` prefixes links to images and the quiz; `api_root` the subscribe call."""
+    rid = receipt["receipt_id"]
+    top2 = top_areas(receipt)
+    variant_name = receipt.get("variant_name", "")
+    page_abs, badge_abs = page_url, badge_url
+
+    cards_html = "".join([
+        f"<div class='mini'><h4>{c['title']}</h4>"
+        f"<div><b>Signal:</b> {c['signal']}</div>"
+        f"<div><b>Maria does:</b> {c['maria']}</div>"
+        f"<div><b>Outcome:</b> {c['outcome']}</div></div>"
+        for c in receipt.get("cheat_sheet", [])
+    ])
+
+    caption_plain = (
+        f"I’m {receipt.get('variant_name','')} (Work Mode: {receipt.get('house_name','')}).\n\n"
+        f"{receipt.get('variant_means','')}\n\n"
+        f"Fastest win: {receipt.get('fastest_win','')}\n\n"
+        f"Want your own share-safe archetype + Work Week Receipt? Comment ‘RECEIPT’ and I’ll send the link."
+    )
+
+    html = f"""
+<!doctype html>
+<html>
+<head>
+  <link rel="preconnect" href="https://fonts.googleapis.com">
+  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+  <link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap">
+  <meta charset="utf-8"/>
+  <meta name="viewport" content="width=device-width, initial-scale=1"/>
+  <title>Work Mode Quiz Result + Receipt</title>
+  <meta property="og:title" content="My Work Week Work Mode: {variant_name}"/>
+  <meta property="og:description" content="60-second quiz • share-safe • get your badge + receipt"/>
+  <meta property="og:image" content="{badge_abs}"/>
+  <meta property="og:url" content="{page_abs}"/>
+  <meta name="twitter:card" content="summary_large_image"/>
+
+  <style>
+    body {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial; background:#fafafa; margin:0; }}
+    .wrap {{ max-width: 920px; margin: 0 auto; padding: 24px; }}
+    .card {{ background:#fff; border:1px solid #e6e6e6; border-radius: 18px; padding: 18px; }}
+    img {{ width:100%; height:auto; border-radius: 12px; border:1px solid #eee; }}
+    .row {{ display:flex; gap:12px; flex-wrap:wrap; margin-top: 12px; }}
+    button, input, textarea {{ font-size:16px; padding:12px 14px; border-radius:12px; border:1px solid #ddd; }}
+    button {{ background:#111; color:#fff; border:none; cursor:pointer; }}
+    .muted {{ color:#666; font-size: 14px; }}
+    .grid {{ display:grid; grid-template-columns: repeat(auto-fit, minmax(240px, 1fr)); gap: 10px; margin-top: 14px; }}
+    .mini {{ border:1px solid #eee; border-radius:14px; padding: 12px; }}
+    .mini h4 {{ margin:0 0 6px 0; font-size:14px; }}
+    .mini div {{ font-size:13px; color:#333; margin-bottom: 6px; }}
+    .two {{ display:grid; grid-template-columns: 1fr; gap: 12px; }}
+    @media (min-width: 860px) {{ .two {{ grid-template-columns: 1fr 1fr; }} }}
+    textarea {{ width: 100%; min-height: 120px; }}
+  </style>
+</head>
+<body>
+  <div class="wrap">
+    <div class="card">
+      <h2 style="margin:0 0 10px 0;">Your Work Mode Quiz Result + Receipt</h2>
+      <div class="muted">Share-safe. No message titles/subjects/names. Ranges + normalized labels only.</div>
+
+      <div class="two" style="margin-top:12px;">
+        <div>
+          <h3 style="margin:0 0 8px 0;">LinkedIn Badge (best for posting)</h3>
+          <img src="{root}b/{rid}.svg" alt="Badge image"/>
+          <div class="row">
+            <a href="{root}b/{rid}.png" download><button>Download badge</button></a>
+            <button onclick="navigator.clipboard.writeText(document.getElementById('cap').value)">Copy LinkedIn caption</button>
+          </div>
+          <div style="height:10px;"></div>
+          <textarea id="cap">{caption_plain}</textarea>
+          <div class="muted" style="margin-top:8px;">Tip: post the badge + caption. Ask a question (e.g., “What’s your Work Mode?”).</div>
+        </div>
+
+        <div>
+          <h3 style="margin:0 0 8px 0;">Full Receipt (proof + plan)</h3>
+          <img src="{root}i/{rid}.svg" alt="Receipt image"/>
+          <div class="row">
+            <a href="{root}i/{rid}.png" download><button>Download receipt</button></a>
+            <button onclick="navigator.clipboard.writeText(window.location.href)">Copy link</button>
+            <a href="{root}"><button style="background:#2b2b2b;">Make yours</button></a>
+          </div>
+        </div>
+      </div>
+
+      <div style="height:18px;"></div>
+      <h3 style="margin:0 0 8px 0;">Stay close to the launch</h3>
+      <div class="muted" style="margin-bottom:10px;">One email. Choose what you want. No spam.</div>
+      <div class="row">
+        <input id="email" placeholder="you@example.com" style="flex:1; min-width:240px;"/>
+        <button onclick="signup()">Notify me at launch</button>
+      </div>
+      <div id="msg" class="muted" style="margin-top:8px;"></div>
+
+      <div style="height:18px;"></div>
+      <h3 style="margin:0 0 8px 0;">Full picture (what Maria could do)</h3>
+      <div class="muted">Cheat sheet preview—based on other common patterns.</div>
+      <div class="grid">{cards_html}</div>
+    </div>
+  </div>
+<script>
+async function signup() {{
+  const email = document.getElementById('email').value;
+  const res = await fetch('{api_root}api/subscribe', {{
+    method:'POST',
+    headers:{{'Content-Type':'application/json'}},
+    body: JSON.stringify({{
+      email,
+      receipt_id: '{rid}',
+      house: '{receipt.get("house_key","")}',
+      variant: '{receipt.get("variant_key","")}',
+      top_areas: {json.dumps(top2)}
+    }})
+  }});
+  const data = await res.json();
+  const msg = document.getElementById('msg');
+  msg.textContent = data.ok ? "You’re on the list. We’ll email you at launch." : (data.error || "Something went wrong.");
+}}
+</script>
+</body>
+</html>
+"""
+    return html
@@ -0,0 +1,86 @@
+"""Minimal local SMTP sink: accepts every message and keeps a count.
+
+    python smtp_sink.py --port 2525
+
+Point the app at it with SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_TLS=0.
+No TLS, no auth, nothing leaves the box.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+from typing import List, Optional
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, keep: int = 0):
+        self.host, self.port = host, port
+        self.keep = keep
+        self.received = 0
+        self.messages: List[bytes] = []
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._session, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def reply(line: str):
+            writer.write(line.encode("ascii") + b"\r\n")
+
+        reply("220 sink ESMTP")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                verb = raw.decode("latin-1").strip().split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    reply("250-sink")
+                    reply("250 8BITMIME")
+                elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    body = await reader.readuntil(b"\r\n.\r\n")
+                    self.received += 1
+                    if self.keep:
+                        self.messages = (self.messages + [body[:-5]])[-self.keep:]
+                    reply("250 OK queued")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def _serve(host: str, port: int):
+    sink = SMTPSink(host, port)
+    port = await sink.start()
+    print(f"SMTP sink listening on {host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"received {sink.received} messages")
+    finally:
+        await sink.stop()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=2525)
+    args = ap.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,174 @@
+// Client-side twin of receipt_engine.build_receipt, driven by the rules
+// artifact from /api/rules.json. The quiz uses it to show the result before
+// the server answers; check_rules.py proves both agree on every input.
+(function(root){
+  'use strict';
+
+  function rangeToMid(r){
+    r = String(r || '').trim();
+    if(!r) return 0;
+    const num = (x) => {
+      x = x.trim();
+      const v = x === '' ? NaN : Number(x);
+      return Number.isFinite(v) ? v : null;
+    };
+    if(r.endsWith('+')){
+      const v = num(r.slice(0, -1));
+      return v === null ? 0 : v + 2.5;
+    }
+    const dash = r.indexOf('-');
+    if(dash >= 0){
+      const a = num(r.slice(0, dash)), b = num(r.slice(dash + 1));
+      return (a === null || b === null) ? 0 : (a + b) / 2;
+    }
+    const v = num(r);
+    return v === null ? 0 : v;
+  }
+
+  function scale(val, cuts){
+    if(val <= cuts[0]) return 0;
+    if(val <= cuts[1]) return 1;
+    if(val <= cuts[2]) return 2;
+    return 3;
+  }
+
+  function lookup(map, key){
+    return Object.prototype.hasOwnProperty.call(map, key) ? map[key] : 0;
+  }
+
+  function holds(sc, when){
+    return when.some(clause => Object.keys(clause).every(area => {
+      const lo = clause[area][0], hi = clause[area][1];
+      return (lo === null || sc[area] >= lo) && (hi === null || sc[area] <= hi);
+    }));
+  }
+
+  function normalizeSurvey(R, s){
+    const str = (k) => String(s[k] === undefined || s[k] === null ? '' : s[k]);
+    const fragmentation = lookup(R.freq_map, str('meet_interrupts').toLowerCase());
+    const notifPress = lookup(R.freq_map, str('notif_interrupt_freq').toLowerCase());
+    const emailBehind = lookup(R.freq_map, str('email_behind_freq').toLowerCase());
+    const responsePress = lookup(R.response_pressure_map, str('response_pressure').toLowerCase());
+    const bottlenecks = lookup(R.collab_people_map, str('collab_people').trim());
+
+    const meetings = scale(rangeToMid(s.meeting_hours_range), R.cuts.meeting_hours);
+    const afterHours = scale(rangeToMid(s.after_hours_hours_range), R.cuts.after_hours);
+    const messagePress = Math.max(scale(rangeToMid(s.email_backlog_range), R.cuts.email_backlog), notifPress);
+    const responseLag = Math.max(responsePress, emailBehind);
+
+    const scores = {
+      MEETINGS: meetings,
+      FRAGMENTATION: fragmentation,
+      AFTER_HOURS: afterHours,
+      MESSAGE_PRESSURE: messagePress,
+      RESPONSE_LAG: responseLag,
+      BOTTLENECKS: bottlenecks,
+    };
+    const areas = {};
+    Object.keys(scores).forEach(k => { areas[k] = R.levels[Math.max(0, Math.min(3, scores[k]))]; });
+    return {
+      ranges: {
+        meeting_hours: s.meeting_hours_range === undefined ? '' : s.meeting_hours_range,
+        after_hours_meeting_hours: s.after_hours_hours_range === undefined ? '' : s.after_hours_hours_range,
+        email_backlog: s.email_backlog_range === undefined ? '' : s.email_backlog_range,
+      },
+      scores,
+      areas,
+    };
+  }
+
+  function weighted(sc, weights){
+    return Object.keys(weights).reduce((w, area) => w + sc[area] * weights[area], 0);
+  }
+
+  function coordinationTax(R, sc){
+    const w = weighted(sc, R.tax_weights);
+    for(const [most, tax, focus] of R.tax_bands){
+      if(most === null || w <= most) return [tax, focus];
+    }
+    throw new Error('tax_bands must end with an open band');
+  }
+
+  function houseScores(R, sc){
+    const out = {};
+    Object.keys(R.house_weights).forEach(h => { out[h] = weighted(sc, R.house_weights[h]); });
+    return out;
+  }
+
+  function pickHouse(R, sc){
+    const hs = houseScores(R, sc);
+    const best = Math.max(...Object.values(hs));
+    const tied = Object.keys(hs).filter(k => hs[k] === best);
+    if(tied.length === 1) return tied[0];
+    for(const rule of R.house_tiebreak){
+      if(tied.includes(rule.house) && holds(sc, rule.when)) return rule.house;
+    }
+    return tied[0];
+  }
+
+  function pickVariant(R, sc, house){
+    for(const rule of R.variant_rules[house]){
+      if(!rule.when || holds(sc, rule.when)) return rule.variant;
+    }
+    throw new Error('variant_rules[' + house + '] must end with a default');
+  }
+
+  // stable, like Python's sorted(..., reverse=True)
+  function ranked(sc){
+    return Object.keys(sc).map(k => [k, sc[k]]).sort((a, b) => b[1] - a[1]);
+  }
+
+  function mariaActions(R, sc){
+    const out = [];
+    ranked(sc).slice(0, 2).forEach(([a]) => (R.actions_by_area[a] || []).forEach(x => {
+      if(!out.includes(x)) out.push(x);
+    }));
+    return out.slice(0, 3);
+  }
+
+  function reclaimPlan(R, sc){
+    const plan = ranked(sc).slice(0, 3)
+      .filter(([a]) => R.reclaim_by_area[a])
+      .map(([a]) => Object.assign({}, R.reclaim_by_area[a]));
+    while(plan.length < 3) plan.push(Object.assign({}, R.reclaim_filler));
+    return plan.slice(0, 3);
+  }
+
+  // Same fields as build_receipt minus mode/created_at, plus top_areas as
+  // /api/receipt-lite returns it.
+  function evaluate(R, survey){
+    const signals = normalizeSurvey(R, survey || {});
+    const sc = signals.scores;
+    const [tax, focus] = coordinationTax(R, sc);
+    const houseKey = pickHouse(R, sc);
+    const house = R.houses[houseKey];
+    const variantKey = pickVariant(R, sc, houseKey);
+    const variant = R.variants[variantKey];
+    return {
+      week_of: survey && survey.week_of !== undefined ? survey.week_of : 'Last week',
+      coordination_tax: tax,
+      focus_lost: focus,
+      risk: R.risk_labels[Math.max(...R.risk_areas.map(a => sc[a]))],
+      house_key: houseKey,
+      house_name: house.name,
+      house_motto: house.motto,
+      house_strength: house.strength,
+      house_shadow: house.shadow,
+      variant_key: variantKey,
+      variant_name: variant.name,
+      variant_means: variant.means,
+      fastest_win: variant.win,
+      maria_actions: mariaActions(R, sc),
+      reclaim_plan: reclaimPlan(R, sc),
+      cheat_sheet: R.cheat_sheet,
+      signals,
+      house_scores: houseScores(R, sc),
+      top_areas: ranked(sc).slice(0, 2),
+      rules_version: R.version,
+    };
+  }
+
+  const api = { evaluate };
+  if(typeof module === 'object' && module.exports) module.exports = api;
+  else root.ChambiarScoring = api;
+})(typeof self !== 'undefined' ? self : this);
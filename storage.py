@@ -0,0 +1,353 @@
+"""Blob storage for receipts, rendered images and badges.
+
+All receipt/image/badge I/O goes through a `BlobStore`. Keys look like
+``receipts/<rid>.json``, ``images/<rid>.png``, ``badges/<rid>.svg``.
+
+STORAGE_BACKEND=local (default)  files under DATA_DIR, sharded (see layout.py);
+                                 IMAGE_STORE=pack keeps images/badges in pack
+                                 files instead (see packstore.py)
+STORAGE_BACKEND=s3               S3-compatible bucket (AWS, MinIO, moto) with a
+                                 read-through cache under DATA_DIR/cache
+
+S3 settings: S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION and the usual
+AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY. Requires boto3. The local cache is
+revalidated after CACHE_TTL seconds (default 300) and kept under
+CACHE_MAX_BYTES (default 1 GiB).
+
+    python storage.py push    # copy local DATA_DIR blobs into the configured store
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+import layout
+import tracing
+
+CONTENT_TYPES = {
+    ".json": "application/json",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+}
+
+def split_key(key: str) -> Tuple[str, str, str]:
+    """'images/3f9a21c0.png' -> ('images', '3f9a21c0', '.png')."""
+    ns, _, name = key.partition("/")
+    rid, dot, ext = name.partition(".")
+    return ns, rid, dot + ext
+
+class BlobStore:
+    """Sync primitives, implemented per backend, plus async wrappers for request handlers."""
+
+    def read(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def write(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    def remove(self, key: str):
+        raise NotImplementedError
+
+    def contains(self, key: str) -> bool:
+        return self.read(key) is not None
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """Yield (key, mtime) for every blob under `prefix` ('receipts/', ...)."""
+        raise NotImplementedError
+
+    def etag(self, key: str) -> Optional[str]:
+        """MD5 hex of the blob (what S3 reports as its ETag), or None if missing."""
+        data = self.read(key)
+        return None if data is None else hashlib.md5(data).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.read, key)
+
+    async def put(self, key: str, data: bytes):
+        with tracing.span("store.put", key=key, bytes=len(data)):
+            await asyncio.to_thread(self.write, key, data)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.remove, key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self.contains, key)
+
+class LocalStore(BlobStore):
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        ns, rid, suffix = split_key(key)
+        return layout.shard_path(self.root / ns, rid, suffix)
+
+    def read(self, key: str) -> Optional[bytes]:
+        ns, rid, suffix = split_key(key)
+        p = layout.find(self.root / ns, rid, suffix)
+        if p is None:
+            return None
+        try:
+            return p.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, data: bytes):
+        layout.write_atomic(self._path(key), data)
+
+    def remove(self, key: str):
+        ns, rid, suffix = split_key(key)
+        p = layout.find(self.root / ns, rid, suffix)
+        if p is not None:
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+
+    def contains(self, key: str) -> bool:
+        ns, rid, suffix = split_key(key)
+        return layout.find(self.root / ns, rid, suffix) is not None
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        ns = prefix.strip("/")
+        for name, p in layout.iter_files(self.root / ns, ""):
+            if name.startswith(".") or not layout.valid_id(name.partition(".")[0]):
+                continue
+            try:
+                yield f"{ns}/{name}", p.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+class S3Store(BlobStore):
+    def __init__(self, bucket: str, prefix: str = "", client=None, **client_kwargs):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+            client = boto3.client("s3", **{k: v for k, v in client_kwargs.items() if v})
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def write(self, key: str, data: bytes):
+        ctype = CONTENT_TYPES.get(split_key(key)[2], "application/octet-stream")
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, ContentType=ctype)
+
+    def remove(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def contains(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def etag(self, key: str) -> Optional[str]:
+        head = self._head(key)
+        return None if head is None else head["ETag"].strip('"')
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix + prefix)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):], obj["LastModified"].timestamp()
+
+class CachedStore(BlobStore):
+    """Read-through, write-through local cache in front of a shared store.
+
+    Other nodes overwrite blobs (rerender.py) and delete them (retention.py),
+    so a cached copy is trusted for `ttl` seconds after it was last checked;
+    after that the remote ETag is compared with the copy's MD5 and a changed
+    or deleted blob is refetched or dropped. A cache file's mtime is when it
+    was last checked, its atime when it was last read. The cache is trimmed
+    to `max_bytes`, least recently read first.
+    """
+
+    def __init__(self, remote: BlobStore, cache: LocalStore, ttl: float = 300.0, max_bytes: int = 1 << 30):
+        self.remote, self.cache = remote, cache
+        self.ttl, self.max_bytes = ttl, max_bytes
+        self._bytes: Optional[int] = None  # this process's running estimate
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Optional[Path]:
+        ns, rid, suffix = split_key(key)
+        return layout.find(self.cache.root / ns, rid, suffix)
+
+    def _fresh(self, p: Path) -> bool:
+        try:
+            return time.time() - p.stat().st_mtime < self.ttl
+        except FileNotFoundError:
+            return False
+
+    def _touch(self, p: Path, checked: bool):
+        now = time.time()
+        try:
+            os.utime(p, (now, now if checked else p.stat().st_mtime))
+        except FileNotFoundError:
+            pass
+
+    def _keep(self, key: str, data: bytes):
+        self.cache.write(key, data)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, _, size in self._files())
+            else:
+                self._bytes += len(data)
+            over = self._bytes > self.max_bytes
+        if over:
+            self.trim()
+
+    def read(self, key: str) -> Optional[bytes]:
+        p = self._path(key)
+        if p is not None:
+            try:
+                data = p.read_bytes()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                if self._fresh(p):
+                    self._touch(p, checked=False)
+                    return data
+                etag = self.remote.etag(key)
+                if etag is None:
+                    self.cache.remove(key)
+                    return None
+                if etag == hashlib.md5(data).hexdigest():
+                    self._touch(p, checked=True)
+                    return data
+        data = self.remote.read(key)
+        if data is None:
+            self.cache.remove(key)
+        else:
+            self._keep(key, data)
+        return data
+
+    def write(self, key: str, data: bytes):
+        self.remote.write(key, data)
+        self._keep(key, data)
+
+    def replace(self, key: str, data: bytes):
+        """Overwrite a blob without caching it here (bulk jobs); drops any local copy."""
+        self.remote.write(key, data)
+        self.cache.remove(key)
+
+    def remove(self, key: str):
+        self.remote.remove(key)
+        self.cache.remove(key)
+
+    def contains(self, key: str) -> bool:
+        p = self._path(key)
+        if p is not None and self._fresh(p):
+            return True
+        return self.remote.contains(key)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        return self.remote.scan(prefix)
+
+    def _files(self) -> Iterator[Tuple[Path, float, int]]:
+        """(path, atime, size) of every cached blob."""
+        root = self.cache.root
+        if not root.exists():
+            return
+        for ns in os.scandir(root):
+            if not ns.is_dir():
+                continue
+            for _, p in layout.iter_files(Path(ns.path), ""):
+                if p.name.startswith("."):
+                    continue
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                yield p, st.st_atime, st.st_size
+
+    def trim(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently read blobs until the cache is within 90% of the limit. Returns bytes freed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        files = sorted(self._files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        freed = 0
+        for p, _, size in files:
+            if total - freed <= limit * 0.9:
+                break
+            p.unlink(missing_ok=True)
+            freed += size
+        with self._lock:
+            self._bytes = total - freed
+        return freed
+
+    def evict_missing(self, prefix: str, live: Set[str]) -> int:
+        """Drop cached blobs under `prefix` that are not in `live` (the remote listing)."""
+        ns = prefix.strip("/")
+        evicted = 0
+        for name, p in layout.iter_files(self.cache.root / ns, ""):
+            if name.startswith(".") or f"{ns}/{name}" in live:
+                continue
+            p.unlink(missing_ok=True)
+            evicted += 1
+        return evicted
+
+def from_env(data: Optional[Path] = None) -> BlobStore:
+    data = data or layout.data_dir()
+    backend = os.getenv("STORAGE_BACKEND", "local").strip().lower()
+    if backend == "local":
+        if os.getenv("IMAGE_STORE", "files").strip().lower() == "pack":
+            from packstore import PackStore, PrefixRouter
+            return PrefixRouter(LocalStore(data), PackStore(data / "packs"))
+        return LocalStore(data)
+    if backend == "s3":
+        bucket = os.getenv("S3_BUCKET", "").strip()
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        remote = S3Store(
+            bucket,
+            prefix=os.getenv("S3_PREFIX", ""),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL", "").strip() or None,
+            region_name=os.getenv("S3_REGION", "").strip() or None,
+        )
+        return CachedStore(
+            remote,
+            LocalStore(data / "cache"),
+            ttl=float(os.getenv("CACHE_TTL", "300")),
+            max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(1 << 30))),
+        )
+    raise RuntimeError(f"unknown STORAGE_BACKEND: {backend!r}")
+
+@lru_cache(maxsize=None)
+def get_store() -> BlobStore:
+    return from_env()
+
+NAMESPACES = ("receipts", "images", "badges")
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Blob storage tools")
+    ap.add_argument("command", choices=["push"])
+    ap.add_argument("--data-dir", type=Path, default=None, help="defaults to $DATA_DIR or ./data")
+    args = ap.parse_args()
+    src = LocalStore(args.data_dir or layout.data_dir())
+    dst = get_store()
+    copied = 0
+    for ns in NAMESPACES:
+        for key, _ in src.scan(ns + "/"):
+            if not dst.contains(key):
+                dst.write(key, src.read(key))
+                copied += 1
+    print(f"copied {copied} blobs")
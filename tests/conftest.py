@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.py reads DATA_DIR at import; keep every test run off ./data. The shared
+# render cache takes seconds to build and is not what these tests cover.
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="chambiar-test-"))
+os.environ.setdefault("RENDER_CACHE", "0")
+
+import pytest
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import app
+
+    with TestClient(app.app) as c:
+        yield c
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+import admission
+import app
+
+SURVEY = {"meeting_hours_range": "10-15", "meet_interrupts": "Every day"}
+
+# request `limits` before `client` so the app shuts down before it is swapped back
+@pytest.fixture
+def limits(monkeypatch):
+    adm = admission.Admission(per_minute=60, burst=2, max_clients=2, concurrency=1, queue_timeout=0.1)
+    monkeypatch.setattr(app, "ADMISSION", adm)
+    monkeypatch.setattr(app.IDEMPOTENCY, "ttl", 0)
+    return adm
+
+def test_token_bucket_refills_and_client_tracking_is_bounded():
+    adm = admission.Admission(per_minute=60, burst=2, max_clients=2, concurrency=1, queue_timeout=0)
+    assert adm.client_retry_after("a") == 0
+    assert adm.client_retry_after("a") == 0
+    assert 0 < adm.client_retry_after("a") <= 1
+    assert adm.counters["shed_rate_limited"] == 1
+    adm._clients["a"].updated -= 1  # a second later: one token back
+    assert adm.client_retry_after("a") == 0
+
+    adm.client_retry_after("b")
+    adm.client_retry_after("c")
+    assert adm.clients == 2 and "a" not in adm._clients
+    assert adm.counters["clients_evicted"] == 1
+
+def test_receipt_lite_sheds_with_429_and_retry_after(limits, client):
+    codes = [client.post("/api/receipt-lite", json=SURVEY).status_code for _ in range(3)]
+    assert codes == [200, 200, 429]
+    r = client.post("/api/receipt-lite", json=SURVEY)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert r.json()["ok"] is False
+    assert "chambiar_admission_shed_rate_limited_total 2" in client.get("/metrics").text
+
+def test_receipt_lite_does_not_wait_for_a_render_slot(limits, client):
+    assert client.portal.call(limits.acquire_render)
+    try:
+        t0 = time.perf_counter()
+        r = client.post("/api/receipt-lite", json=SURVEY)
+        assert r.status_code == 200
+        assert time.perf_counter() - t0 < limits.queue_timeout + 0.5
+        rid = r.json()["receipt_id"]
+        # the on-demand PNG path still sheds once its queue timeout passes
+        png = client.get(f"/i/{rid}.png")
+        assert png.status_code == 503 and png.headers["Retry-After"] == "1"
+    finally:
+        client.portal.call(limits.release_render)
+
+def test_forwarded_for_spoofing_does_not_change_the_client_key(limits, client, monkeypatch):
+    monkeypatch.setenv("TRUST_PROXY", "1")
+    # what one load balancer passes on for a caller that forges the header
+    codes = [client.post("/api/receipt-lite", json=SURVEY,
+                         headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}).status_code
+             for i in range(3)]
+    assert codes == [200, 200, 429]
+    assert client.post("/api/receipt-lite", json=SURVEY,
+                       headers={"X-Forwarded-For": "203.0.113.8"}).status_code == 200
+
+def test_client_key_takes_the_entry_left_by_the_trusted_proxies():
+    class Req:
+        headers = {"x-forwarded-for": "1.1.1.1, 2.2.2.2, 3.3.3.3"}
+        client = type("C", (), {"host": "9.9.9.9"})
+    assert admission.client_key(Req, hops=0) == "9.9.9.9"
+    assert admission.client_key(Req, hops=1) == "3.3.3.3"
+    assert admission.client_key(Req, hops=2) == "2.2.2.2"
+    assert admission.client_key(Req, hops=4) == "9.9.9.9"
+
+def test_receipt_lite_sheds_once_the_background_queue_is_full(limits, client):
+    limits.render_queue_max = 1
+    assert client.portal.call(limits.acquire_render)  # the queued render cannot start
+    try:
+        assert client.post("/api/receipt-lite", json=SURVEY).status_code == 200
+        r = client.post("/api/receipt-lite", json=SURVEY)
+        assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+        assert limits.counters["shed_overloaded"] == 1
+    finally:
+        client.portal.call(limits.release_render)
@@ -0,0 +1,31 @@
+import importlib.util
+import sys
+
+import pytest
+
+import codec
+from models import SurveyIn
+
+SAMPLE = {"receipt_id": "ab12cd34", "house_name": "Calendar Keepers", "maria_actions": ["Résumé • “quoted”"],
+          "scores": {"MEETINGS": 3, "ratio": 0.5}, "ok": True, "none": None}
+
+@pytest.fixture
+def stdlib_codec(monkeypatch):
+    """A second copy of codec.py loaded as if orjson were not installed."""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    spec = importlib.util.spec_from_file_location("codec_stdlib", codec.__file__)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    assert mod.orjson is None
+    return mod
+
+def test_stdlib_fallback_matches_orjson(stdlib_codec):
+    if codec.orjson is not None:
+        assert stdlib_codec.dumps(SAMPLE) == codec.dumps(SAMPLE)
+    assert stdlib_codec.loads(stdlib_codec.dumps(SAMPLE)) == SAMPLE
+    assert stdlib_codec.loads(b'{\n  "indented": [1, 2]\n}') == {"indented": [1, 2]}
+    assert stdlib_codec.JSONResponse(SAMPLE).body == stdlib_codec.dumps(SAMPLE)
+
+def test_survey_fields_still_accept_numbers():
+    s = SurveyIn.model_validate_json(b'{"collab_people": 5, "meeting_hours_range": 12.5, "client_token": 7}')
+    assert (s.collab_people, s.meeting_hours_range, s.client_token) == ("5", "12.5", "7")
@@ -0,0 +1,53 @@
+import os
+import re
+import stat
+import time
+
+import codec
+import export
+import retention
+import storage
+from receipt_engine import SURVEY_OPTIONS, build_receipt
+
+def _save(store, rid):
+    receipt = build_receipt({k: v[0] for k, v in SURVEY_OPTIONS.items()})
+    receipt["receipt_id"] = rid
+    store.write(f"receipts/{rid}.json", codec.dumps(receipt))
+
+def test_export_renders_missing_images_and_links_relatively(tmp_path):
+    store = storage.LocalStore(tmp_path / "data")
+    _save(store, "ex000001")
+    out = tmp_path / "out"
+    exporter = export.Exporter(out)
+
+    assert exporter.export_receipt(store, "ex000001")
+    assert not exporter.export_receipt(store, "missing1")
+    # the receipt PNG was never rendered; exporting renders and stores it
+    assert store.read("images/ex000001.png").startswith(b"\x89PNG")
+    assert (out / "i/ex000001.png").read_bytes() == store.read("images/ex000001.png")
+    assert stat.S_IMODE(os.stat(out / "i/ex000001.png").st_mode) == 0o644
+
+    page = exporter.page_path("ex000001")
+    links = re.findall(r'(?:src|href)="(\.\./\.\./[^"]*)"', page.read_text(encoding="utf-8"))
+    assert "../../b/ex000001.png" in links
+    for link in links:
+        assert (page.parent / link).resolve().exists(), link
+
+def test_prune_drops_pages_of_receipts_retention_deleted(tmp_path):
+    data = tmp_path / "data"
+    store = storage.LocalStore(data)
+    exporter = export.Exporter(tmp_path / "out")
+    for rid in ("old00001", "new00001"):
+        _save(store, rid)
+        exporter.export_receipt(store, rid)
+    old = time.time() - 40 * 86400
+    for ns in storage.NAMESPACES:
+        for path in (data / ns / "ol").iterdir():
+            os.utime(path, (old, old))
+
+    assert retention.sweep(data, store, 30) == 5
+    assert exporter.prune(store) == 1
+    assert not exporter.page_path("old00001").exists()
+    assert not (exporter.out / "b/old00001.png").exists()
+    assert exporter.page_path("new00001").exists()
+    assert (exporter.out / "b/new00001.png").exists()
@@ -0,0 +1,12 @@
+
+import check_glyphs
+import renderer
+from receipt_engine import VARIANTS
+
+def test_atlas_measures_and_draws_like_imagedraw():
+    assert check_glyphs.check_fonts() == sum(len(sizes) for sizes in renderer.FONT_SIZES.values())
+
+def test_atlas_pngs_are_pixel_identical(monkeypatch):
+    monkeypatch.setattr(renderer, "_ATLAS", renderer._ATLAS)
+    # every variant once; `python check_glyphs.py` runs the full sample
+    assert check_glyphs.check_images(0) == 2 * len(VARIANTS)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import admission
+import app
+import idempotency
+
+SURVEY = {"meeting_hours_range": "10-15", "collab_people": "6-10"}
+
+@pytest.fixture
+def one_token(monkeypatch):
+    monkeypatch.setattr(app, "ADMISSION", admission.Admission(
+        per_minute=1, burst=1, max_clients=10, concurrency=2, queue_timeout=1))
+    monkeypatch.setattr(app, "IDEMPOTENCY", idempotency.IdempotencyCache(ttl=600, max_entries=100))
+
+def test_replay_returns_the_first_response_without_a_rate_limit_token(one_token, client):
+    headers = {"Idempotency-Key": "retry-me"}
+    first = client.post("/api/receipt-lite", json=SURVEY, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    again = client.post("/api/receipt-lite", json=SURVEY, headers=headers)
+    assert again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == first.json()
+
+    # the bucket is empty: anything that is not a replay is shed
+    assert client.post("/api/receipt-lite", json=SURVEY, headers={"Idempotency-Key": "other"}).status_code == 429
+    assert app.IDEMPOTENCY.counters["replayed"] == 1
+
+def test_client_token_keys_on_the_answers(client):
+    body = dict(SURVEY, client_token="browser-1")
+    a = client.post("/api/receipt-lite", json=body).json()["receipt_id"]
+    assert client.post("/api/receipt-lite", json=body).json()["receipt_id"] == a
+    changed = dict(body, collab_people="1-2")
+    assert client.post("/api/receipt-lite", json=changed).json()["receipt_id"] != a
+
+def test_concurrent_repeats_join_the_first_and_errors_are_not_kept():
+    cache = idempotency.IdempotencyCache(ttl=600, max_entries=10)
+    calls = []
+
+    async def make():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"receipt_id": f"r{len(calls)}"}
+
+    async def main():
+        return await asyncio.gather(*(cache.run("k", make, ok=lambda r: True) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert {r["receipt_id"] for r, _ in results} == {"r1"}
+    assert sum(replayed for _, replayed in results) == 4
+    assert cache.seen("k")
+
+    async def fail():
+        return None
+
+    assert asyncio.run(cache.run("bad", fail, ok=lambda r: r is not None)) == (None, False)
+    assert not cache.seen("bad")
+
+def test_reusing_a_key_with_different_answers_is_rejected(client):
+    headers = {"Idempotency-Key": "same-key"}
+    first = client.post("/api/receipt-lite", json=SURVEY, headers=headers)
+    assert first.status_code == 200
+
+    other = client.post("/api/receipt-lite", json=dict(SURVEY, collab_people="1-2"), headers=headers)
+    assert other.status_code == 422
+    assert other.json()["ok"] is False
+    assert "receipt_id" not in other.json()
+
+    # the original answers still replay
+    again = client.post("/api/receipt-lite", json=SURVEY, headers=headers)
+    assert again.json()["receipt_id"] == first.json()["receipt_id"]
@@ -0,0 +1,69 @@
+import os
+
+from packstore import PackStore
+
+def _blob(i: int) -> bytes:
+    return bytes([i % 251]) * (1000 + i)
+
+def test_compaction_reclaims_dead_bytes_and_keeps_live_blobs(tmp_path):
+    pack = PackStore(tmp_path, segment_bytes=8000)
+    keys = [f"images/r{i:02d}.png" for i in range(20)]
+    for i, key in enumerate(keys):
+        pack.write(key, _blob(i))
+    assert len(pack.stats()) > 2
+    for key in keys[:12]:
+        pack.remove(key)
+
+    reader = PackStore(tmp_path)  # another worker sharing the directory
+    assert reader.read(keys[15]) == _blob(15)
+    before = sum(size for size, _ in pack.stats().values())
+
+    reclaimed = pack.compact(min_dead=0.3)
+    assert reclaimed > 0
+    assert sum(size for size, _ in pack.stats().values()) == before - reclaimed
+    for i, key in enumerate(keys):
+        want = _blob(i) if i >= 12 else None
+        assert pack.read(key) == want
+        reader._refresh()
+        assert reader.read(key) == want
+    assert sorted(k for k, _ in reader.scan("images/")) == keys[12:]
+
+    # a restart rebuilds the same view from the swapped-in index
+    assert {k: PackStore(tmp_path).read(k) for k in keys[12:]} == {k: pack.read(k) for k in keys[12:]}
+
+def test_refresh_after_index_swap_reads_the_new_file_from_the_start(tmp_path):
+    pack = PackStore(tmp_path, segment_bytes=4000)
+    for i in range(8):
+        pack.write(f"badges/b{i}.png", _blob(i))
+    reader = PackStore(tmp_path)
+    for i in range(6):
+        pack.remove(f"badges/b{i}.png")
+    reader._refresh()
+    old_pos = reader._index_pos
+    pack.compact(min_dead=0.1)
+    # the compacted index is shorter than what the reader had already consumed
+    assert os.path.getsize(pack.index_path) < old_pos
+    reader._refresh()
+    assert reader.read("badges/b7.png") == _blob(7)
+    assert reader.read("badges/b0.png") is None
+
+def test_compaction_only_closes_maps_under_the_read_lock(tmp_path, monkeypatch):
+    pack = PackStore(tmp_path, segment_bytes=4000)
+    for i in range(8):
+        pack.write(f"images/m{i}.png", _blob(i))
+    assert pack.read("images/m0.png") == _blob(0)  # map the first segment
+    for i in range(6):
+        pack.remove(f"images/m{i}.png")
+
+    drop = pack._drop_maps
+    unlocked = []
+    def checked():
+        # reads slice maps under _mu; closing one without it races them
+        if not pack._mu.locked():
+            unlocked.append(True)
+        drop()
+    monkeypatch.setattr(pack, "_drop_maps", checked)
+
+    assert pack.compact(min_dead=0.1) > 0
+    assert unlocked == []
+    assert pack.read("images/m7.png") == _blob(7)
@@ -0,0 +1,37 @@
+import json
+
+import app
+
+SURVEY = {"meeting_hours_range": "15-20", "email_backlog_range": "30-60"}
+
+def _events(body: str):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+def test_events_stream_badge_then_receipt_milestones(client):
+    r = client.post("/api/receipt-lite", json=SURVEY).json()
+    rid = r["receipt_id"]
+    assert r["events_url"] == f"/api/events/{rid}"
+
+    live = client.get(r["events_url"])
+    assert live.headers["content-type"].startswith("text/event-stream")
+    assert live.headers["cache-control"] == "no-cache"
+    events = _events(live.text)
+    assert [name for name, _ in events] == ["badge_ready", "receipt_ready"]
+    assert events[0][1] == {"receipt_id": rid, "badge_svg_url": f"/b/{rid}.svg", "badge_url": f"/b/{rid}.png"}
+    assert events[1][1]["image_svg_url"] == f"/i/{rid}.svg"
+    urls = {**events[0][1], **events[1][1]}
+    for key in ("badge_svg_url", "badge_url", "image_svg_url"):
+        assert client.get(urls[key]).status_code == 200
+
+    # once the job is gone (or on another worker) the store answers the same
+    assert rid not in app._RENDERS
+    assert _events(client.get(r["events_url"]).text) == events
+
+def test_events_for_unknown_receipt_are_404(client):
+    assert client.get("/api/events/nope0000").status_code == 404
+    assert client.get("/api/events/..%2Fx").status_code == 404
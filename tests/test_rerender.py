@@ -0,0 +1,24 @@
+import codec
+import receipt_engine
+import rerender
+import storage
+from receipt_engine import SURVEY_OPTIONS, build_receipt
+
+def test_copy_change_reaches_stored_receipt_and_images(tmp_path, monkeypatch):
+    store = storage.LocalStore(tmp_path)
+    monkeypatch.setattr(storage, "get_store", lambda: store)
+    receipt = build_receipt({k: v[0] for k, v in SURVEY_OPTIONS.items()})
+    receipt["receipt_id"] = "rr000001"
+    store.write("receipts/rr000001.json", codec.dumps(receipt))
+
+    variant = receipt_engine.VARIANTS[receipt["variant_key"]]
+    monkeypatch.setitem(variant, "name", "The Renamed Variant")
+    monkeypatch.setitem(variant, "win", "A brand new fastest win.")
+
+    assert rerender.rerender_one("rr000001") == 3  # no receipt PNG stored, so none rendered
+    saved = codec.loads(store.read("receipts/rr000001.json"))
+    assert saved["variant_name"] == "The Renamed Variant"
+    assert saved["fastest_win"] == "A brand new fastest win."
+    assert saved["house_name"] == receipt["house_name"]
+    assert b"The Renamed Variant" in store.read("badges/rr000001.svg")
+    assert not store.contains("images/rr000001.png")
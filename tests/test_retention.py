@@ -0,0 +1,32 @@
+import os
+import time
+
+import retention
+import storage
+
+DAY = 86400
+
+def _put(store, key, age_days, now):
+    store.write(key, b"x")
+    ns, rid, suffix = storage.split_key(key)
+    path = store.root / ns / rid[:2] / f"{rid}{suffix}"
+    os.utime(path, (now - age_days * DAY, now - age_days * DAY))
+
+def test_sweep_expires_old_blobs_but_keeps_marked_and_subscribed(tmp_path):
+    store = storage.LocalStore(tmp_path)
+    now = time.time()
+    for rid, age in (("old1", 40), ("old2", 40), ("old3", 40), ("new1", 1)):
+        _put(store, f"receipts/{rid}.json", age, now)
+        _put(store, f"images/{rid}.png", age, now)
+    store.write("keep/old2", b"")
+    (tmp_path / "subscribers.jsonl").write_text('{"receipt_id": "old3"}\nnot json\n', encoding="utf-8")
+
+    assert retention.sweep(tmp_path, store, 30, now=now, dry_run=True) == 2
+    assert store.contains("receipts/old1.json")
+
+    assert retention.sweep(tmp_path, store, 30, now=now) == 2
+    assert not store.contains("receipts/old1.json")
+    assert not store.contains("images/old1.png")
+    for rid in ("old2", "old3", "new1"):
+        assert store.contains(f"receipts/{rid}.json")
+        assert store.contains(f"images/{rid}.png")
@@ -0,0 +1,11 @@
+import pytest
+
+import check_rules
+
+def test_scoring_js_matches_build_receipt_on_every_input():
+    node = check_rules.find_node()
+    if not node:
+        pytest.skip("node not installed; set NODE to run the scoring.js consistency check")
+    n, error = check_rules.check(node)
+    assert error is None, error
+    assert n > 0
@@ -0,0 +1,52 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops
+
+import renderer
+import sharedcache
+from receipt_engine import SURVEY_OPTIONS, build_receipt
+
+@pytest.fixture(scope="module")
+def cache(tmp_path_factory):
+    return sharedcache.SharedCache(sharedcache.ensure(tmp_path_factory.mktemp("render-cache")))
+
+@pytest.fixture
+def shared(cache, monkeypatch):
+    monkeypatch.setattr(renderer, "_SHARED", cache)
+    renderer._receipt_plate.cache_clear()
+    renderer._badge_plate.cache_clear()
+    yield cache
+    renderer._receipt_plate.cache_clear()
+    renderer._badge_plate.cache_clear()
+
+def _plates():
+    yield "plate:receipt", renderer._build_receipt_plate
+    for style in renderer.HOUSE_STYLE.values():
+        yield renderer.badge_plate_key(style["accent"]), lambda a=style["accent"]: renderer._build_badge_plate(a)
+
+def test_plates_are_mapped_in_place(cache):
+    for name, build in _plates():
+        img = cache.image(name)
+        assert img.readonly == 1, name
+        assert not ImageChops.difference(img.convert("RGB"), build()).getbbox(), name
+
+def _png(fn, receipt) -> Image.Image:
+    buf = io.BytesIO()
+    fn(receipt, buf)
+    buf.seek(0)
+    return Image.open(buf).convert("RGB")
+
+def test_renders_from_the_cache_match_per_process_plates(shared):
+    receipt = build_receipt({k: v[0] for k, v in SURVEY_OPTIONS.items()})
+    receipt["receipt_id"] = "check000"
+    for fn in (renderer.render_receipt_png, renderer.render_badge_png):
+        got = _png(fn, receipt)
+        renderer._SHARED = None
+        renderer._receipt_plate.cache_clear()
+        renderer._badge_plate.cache_clear()
+        want = _png(fn, receipt)
+        renderer._SHARED = shared
+        renderer._receipt_plate.cache_clear()
+        renderer._badge_plate.cache_clear()
+        assert not ImageChops.difference(got, want).getbbox(), fn.__name__
@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+import retention
+import storage
+
+BUCKET = "chambiar-test"
+
+@pytest.fixture
+def s3(monkeypatch):
+    for k in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(k, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield storage.S3Store(BUCKET, prefix="app", client=client)
+
+def _node(s3, root, **kwargs):
+    return storage.CachedStore(s3, storage.LocalStore(root / "cache"), **kwargs)
+
+def _age(store, key, seconds):
+    p = store._path(key)
+    t = time.time() - seconds
+    os.utime(p, (t, t))
+
+def test_write_through_and_read_through(s3, tmp_path):
+    a, b = _node(s3, tmp_path / "a"), _node(s3, tmp_path / "b")
+    a.write("receipts/r1.json", b"{}")
+    assert s3.read("receipts/r1.json") == b"{}"
+    assert a.cache.read("receipts/r1.json") == b"{}"
+
+    assert b.cache.read("receipts/r1.json") is None
+    assert b.read("receipts/r1.json") == b"{}"
+    assert b.cache.read("receipts/r1.json") == b"{}"
+    assert b.read("receipts/missing.json") is None
+
+def test_scan_lists_the_shared_bucket(s3, tmp_path):
+    a = _node(s3, tmp_path / "a")
+    for rid in ("r1", "r2"):
+        a.write(f"images/{rid}.png", b"png")
+    a.write("receipts/r1.json", b"{}")
+    assert sorted(k for k, _ in a.scan("images/")) == ["images/r1.png", "images/r2.png"]
+    assert s3.etag("images/r1.png") == storage.BlobStore.etag(a.cache, "images/r1.png")
+
+def test_stale_copy_is_revalidated(s3, tmp_path):
+    a, b = _node(s3, tmp_path / "a"), _node(s3, tmp_path / "b", ttl=60)
+    a.write("badges/r1.png", b"v1")
+    assert b.read("badges/r1.png") == b"v1"
+
+    a.replace("badges/r1.png", b"v2")  # e.g. rerender.py on another node
+    assert b.read("badges/r1.png") == b"v1"  # within the TTL
+    _age(b, "badges/r1.png", 120)
+    assert b.read("badges/r1.png") == b"v2"
+
+    a.remove("badges/r1.png")
+    _age(b, "badges/r1.png", 120)
+    assert b.read("badges/r1.png") is None
+    assert b._path("badges/r1.png") is None
+
+def test_cache_is_trimmed_least_recently_read_first(s3, tmp_path):
+    a = _node(s3, tmp_path / "a", max_bytes=2500)
+    for i in range(3):
+        a.write(f"images/r{i}.png", b"x" * 1000)
+        _age(a, f"images/r{i}.png", 100 - i)
+    a.read("images/r0.png")  # most recent read now
+    a.write("images/r3.png", b"x" * 1000)
+    cached = sorted(p.name for p, _, _ in a._files())
+    assert "r0.png" in cached
+    assert "r1.png" not in cached
+    assert sum(size for _, _, size in a._files()) <= 2500
+    assert a.read("images/r1.png") == b"x" * 1000  # still in the bucket
+
+def test_sweep_expires_remote_blobs_and_evicts_other_nodes_copies(s3, tmp_path):
+    a, b = _node(s3, tmp_path / "a"), _node(s3, tmp_path / "b")
+    a.write("receipts/old.json", b"{}")
+    a.write("receipts/kept.json", b"{}")
+    a.write("keep/kept", b"")
+    b.read("receipts/old.json")
+    b.read("receipts/kept.json")
+
+    assert retention.sweep(tmp_path / "a", a, 1, now=time.time() + 2 * 86400) == 1
+    assert s3.read("receipts/old.json") is None
+    assert a.cache.read("receipts/old.json") is None
+
+    # node b's copy outlives the blob until b's own sweep
+    assert b.cache.read("receipts/old.json") == b"{}"
+    assert retention.sweep(tmp_path / "b", b, 1) == 0
+    assert b.cache.read("receipts/old.json") is None
+    assert b.cache.read("receipts/kept.json") == b"{}"
@@ -0,0 +1,16 @@
+import uuid
+
+import tracing
+
+def test_request_id_accepts_uuids_and_ulids():
+    for rid in (str(uuid.uuid4()), "01ARZ3NDEKTSV4RRFFQ69G5FAV", "Root=1-5759e988-bd862e3fe1be46a994272793", "x"):
+        assert tracing.valid_request_id(rid), rid
+    for rid in ("", "a b", "abc\n", "abc\r\nSet-Cookie: x=1", "é", "a" * 129):
+        assert not tracing.valid_request_id(rid), rid
+
+def test_response_echoes_caller_request_id(client):
+    rid = str(uuid.uuid4())
+    assert client.get("/readyz", headers={"X-Request-ID": rid}).headers["x-request-id"] == rid
+
+    got = client.get("/readyz", headers={"X-Request-ID": "a" * 200}).headers["x-request-id"]
+    assert got != "a" * 200 and tracing.valid_request_id(got)
@@ -0,0 +1,218 @@
+"""Lightweight span tracing for finding out where a slow request spent its time.
+
+Each sampled request gets a trace; code wraps interesting work in spans:
+
+    with tracing.span("build_receipt"):
+        ...
+
+    @tracing.traced("render._add_soft_noise")
+    def _add_soft_noise(...): ...
+
+The current span lives in a contextvar, so spans opened in asyncio tasks and
+asyncio.to_thread workers attach to the request that started them. Sampling
+is decided once per request (TRACE_SAMPLE_RATE, 0..1, default 0 = off);
+unsampled requests pay one contextvar lookup per span.
+
+Finished spans are queued and written by a background thread to a rotating
+JSONL file (TRACE_FILE, default DATA_DIR/traces/spans.jsonl; TRACE_MAX_BYTES,
+TRACE_BACKUPS), one span per line with OTLP field names: traceId, spanId,
+parentSpanId, name, kind, startTimeUnixNano, endTimeUnixNano, attributes,
+status. Every span carries the request id (also returned as X-Request-ID).
+"""
+from __future__ import annotations
+import contextvars
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import codec
+import layout
+
+_log = logging.getLogger("chambiar.trace")
+_log.propagate = False
+
+# caller-supplied X-Request-ID: any printable token (UUID, ULID, trace
+# header values), no spaces or control characters, capped in length
+_REQUEST_ID = re.compile(r"[\x21-\x7e]{1,128}")
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("chambiar_span", default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def sample_rate() -> float:
+    return float(os.getenv("TRACE_SAMPLE_RATE", "0") or 0)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = "", kind: str = "INTERNAL",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.start = time.time_ns()
+        self.end = 0
+        self.error = ""
+        self._token = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        """Accumulate a number, e.g. time spent in many small calls."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def child(self, name: str, **attributes) -> "Span":
+        attributes.setdefault("request.id", self.attributes.get("request.id", ""))
+        return Span(name, self.trace_id, self.span_id, attributes=attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.finish()
+        return False
+
+    def finish(self):
+        self.end = time.time_ns()
+        if _listener is not None:
+            _log.info(codec.dumps(self.record()).decode("utf-8"))
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+class _NoSpan:
+    """Stand-in when the request is not sampled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+def span(name: str, **attributes):
+    """Child span of the current one, or a no-op outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+        return _NO_SPAN
+    return parent.child(name, **attributes)
+
+def traced(name: str):
+    """Decorator form of `span`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            parent = _current.get()
+            if parent is None:
+                return fn(*args, **kwargs)
+            with parent.child(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def valid_request_id(rid: str) -> bool:
+    return bool(_REQUEST_ID.fullmatch(rid or ""))
+
+def start_request(name: str, request_id: str, **attributes):
+    """Root span for one request, if this request is sampled."""
+    rate = sample_rate()
+    if _listener is None or rate <= 0 or (rate < 1 and random.random() >= rate):
+        return _NO_SPAN
+    return Span(name, secrets.token_hex(16), kind="SERVER", attributes={"request.id": request_id, **attributes})
+
+def start(path: Optional[Path] = None):
+    """Start the writer thread. No-op when sampling is off."""
+    global _listener
+    if _listener is not None or sample_rate() <= 0:
+        return
+    path = Path(path or os.getenv("TRACE_FILE", "") or layout.data_dir() / "traces" / "spans.jsonl")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024))),
+        backupCount=int(os.getenv("TRACE_BACKUPS", "5")),
+        encoding="utf-8",
+    )
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    _log.handlers[:] = [logging.handlers.QueueHandler(q)]
+    _log.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(q, handler)
+    _listener.start()
+
+def stop():
+    """Flush queued spans and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for h in _listener.handlers:
+        h.close()
+    _listener = None
+
+class TraceMiddleware:
+    """ASGI middleware: a root span per sampled request, X-Request-ID on every response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = ""
+        for k, v in scope.get("headers", ()):
+            if k == b"x-request-id":
+                rid = v.decode("latin-1")
+                break
+        if not valid_request_id(rid):
+            rid = secrets.token_hex(8)
+        root = start_request(f"{scope['method']} {scope['path']}", rid, **{
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", rid.encode("latin-1"))]
+                root.set("http.status_code", message["status"])
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_with_id)
+            route = scope.get("route")
+            if route is not None:
+                root.set("http.route", getattr(route, "path", ""))